@@ -1,37 +1,220 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Blueprint, Response, request, jsonify, send_from_directory, stream_with_context, make_response, current_app
+from datetime import datetime, timezone
+from functools import wraps
 from flask_cors import CORS
 import os
+import time
+import asyncio
+import threading
+import weakref
+from urllib.parse import parse_qs
 from models.artisan import Artisan
 from models.product import Product
-from services.data_service import DataService 
-from services.file_service import FileService
+from services.data_service import create_data_service
 from config import Config
+from utils.pagination import parse_fields, parse_limit
+from utils.helpers import encode_json, decode_json
+from utils import metrics
 from services.google_cloud_service import GoogleCloudService
+from services.response_cache import ResponseCache, make_etag
+from services.image_jobs import ImageJobQueue
+from services.blob_storage import create_blob_storage
+from services.image_pipeline import ImagePipeline
+from services.description_batch import DescriptionBatch
 
 
-app = Flask(__name__)
-app.config.from_object(Config)
-CORS(app)  
+api = Blueprint('api', __name__)
 
-# Services
-data = DataService()  
-files = FileService() 
-google_service = GoogleCloudService()
+# Every app's Services, so a forked worker can reset them all (see after_fork)
+_built = weakref.WeakSet()
 
-@app.route('/uploads/<path:filename>')
+class Services:
+    """The services one app runs on, built from its config.
+
+    Kept in app.extensions['kala_kaksh']; views get them with services(),
+    so two apps in one process never share a catalog or a job queue.
+    """
+    
+    def __init__(self, config):
+        self.data = create_data_service(config.DATA_DIR, config.STORAGE_ENGINE, config.SQLITE_PATH)
+        # Every upload route processes the same way and stores into the same backend
+        self.blob_storage = create_blob_storage(config.BLOB_STORAGE, config)
+        self.images = ImagePipeline(self.blob_storage, os.path.join(config.UPLOAD_FOLDER, 'incoming'),
+                                    os.path.join(config.UPLOAD_FOLDER, 'images'), config.IMAGE_QUALITY)
+        self.google_service = GoogleCloudService(self.blob_storage, config=config)
+        self.description_batch = DescriptionBatch(self.data, self.google_service,
+                                                  config.DESCRIPTION_BATCH_CHECKPOINT,
+                                                  config.DESCRIPTION_BATCH_RATE,
+                                                  config.DESCRIPTION_BATCH_CONCURRENCY)
+        self.response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL,
+                                            config.RESPONSE_CACHE_MAX_BYTES)
+        # This process's share of the image workers, so 2*cpu+1 gunicorn workers don't each start a cpu-sized pool
+        image_workers = max(1, config.IMAGE_WORKERS // config.WEB_CONCURRENCY)
+        self.image_jobs = ImageJobQueue(config.JOBS_DIR, image_workers, config.IMAGE_QUEUE_SIZE)
+    
+    def after_fork(self):
+        for service in (self.data, self.blob_storage, self.images, self.google_service, self.image_jobs):
+            service.after_fork()
+
+def create_app(config=Config):
+    """Build the app and its services from a config class (Config by default)"""
+    app = Flask(__name__)
+    app.config.from_object(config)
+    CORS(app)
+    metrics.init_app(app)
+    
+    app.extensions['kala_kaksh'] = Services(config)
+    _built.add(app.extensions['kala_kaksh'])
+    
+    app.register_blueprint(api)
+    return app
+
+def services(app=None):
+    """The Services of app (the current app by default)"""
+    return (app or current_app).extensions['kala_kaksh']
+
+def preload(app):
+    """Load everything a worker would otherwise load on its first requests.
+
+    Run in the gunicorn master before it forks, so the catalog, its
+    indexes and the records' JSON are built once and shared by every
+    worker copy-on-write.
+    """
+    loaded = services(app).data.preload()
+    print(f"📦 Preloaded {loaded} catalog records")
+
+def after_fork():
+    """Give a freshly forked worker its own connections, locks and threads"""
+    for svc in list(_built):
+        svc.after_fork()
+
+def cached_response(view):
+    """Serve GET responses from the cache while the catalog hasn't changed.
+
+    Conditional requests (If-None-Match / If-Modified-Since) are answered
+    with a 304 from the data version alone, before the view runs.
+    Last-Modified only has whole seconds, so it is left off until the
+    second of the latest write is over - otherwise a second write in that
+    same second would still look unmodified to If-Modified-Since.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('RESPONSE_CACHE_ENABLED'):
+            return view(*args, **kwargs)
+        
+        svc = services()
+        version, last_modified = svc.data.data_version()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        etag = make_etag(version, key)
+        # Nothing can be written into a second that is already over
+        settled = time.time() >= int(last_modified) + 1
+        
+        if request.if_none_match:
+            # The ETag carries the exact version, so If-Modified-Since is ignored
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = settled and since is not None and int(last_modified) <= since.timestamp()
+        if not_modified:
+            response = current_app.response_class(status=304)
+        else:
+            entry = svc.response_cache.get(key, version)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                # Only cache complete, successful bodies
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = svc.response_cache.put(key, version, response.get_data(), response.mimetype)
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        
+        response.set_etag(etag)
+        if settled:
+            response.last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+        # Clients may keep a copy but should revalidate it each time
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+# Responses assembled from each record's cached JSON fragment instead of
+# re-encoding the whole payload on every request
+def _fragment(record, fields=None, score=None):
+    if fields is not None:
+        item = record.to_dict(fields)
+        if score is not None:
+            item['match_score'] = score
+        return encode_json(item)
+    encoded = record.to_json()
+    if score is not None:
+        # Splice the score in before the closing brace
+        encoded = encoded[:-1] + b',"match_score":' + encode_json(score) + b'}'
+    return encoded
+
+def json_list_response(fragments, listing):
+    meta = encode_json({'count': len(fragments), 'total': listing['total'],
+                        'total_is_estimate': listing.get('total_is_estimate', False),
+                        'next_cursor': listing['next_cursor']})
+    body = b''.join([b'{"success":true,"data":[', b','.join(fragments), b'],', meta[1:]])
+    return Response(body, mimetype='application/json')
+
+def json_record_response(record):
+    return Response(b'{"success":true,"data":' + record.to_json() + b'}', mimetype='application/json')
+
+def queue_image_job(svc, staged, kind, owner_id, task, on_done, url=None):
+    """Hand a staged upload to the image workers and answer 202 straight away"""
+    url = url or staged['url']
+    if staged.get('cached'):
+        # This exact upload was processed before - reuse what's stored
+        return jsonify({
+            'success': True,
+            'filename': staged['filename'],
+            'url': on_done([]),
+            'deduplicated': True
+        })
+    
+    job = svc.image_jobs.submit(kind, owner_id, task, on_done, url=url,
+                            key=staged.get('content_key'), discard=staged['raw_path'])
+    if job is None:
+        svc.images.discard(staged)
+        return jsonify({'success': False, 'error': 'Too many images being processed, try again shortly'}), 503
+    
+    return jsonify({
+        'success': True,
+        'filename': staged['filename'],
+        'url': url,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/jobs/{job['id']}"
+    }), 202
+
+def attach_product_images(svc, product_id, staged_list):
+    """Reference stored images from a product and add them to its images in one write"""
+    keys = [staged['content_key'] for staged in staged_list]
+    urls = [staged['url'] for staged in staged_list]
+    svc.images.store.add_refs(keys, product_id)
+    if svc.data.add_product_images(product_id, urls) is None:
+        for key in keys:
+            svc.images.store.release(key, product_id)
+        raise ValueError('Product no longer exists')
+    return urls
+
+def attach_product_image(svc, product_id, staged):
+    """Reference a stored image from a product and add it to its images"""
+    return attach_product_images(svc, product_id, [staged])[0]
+
+@api.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory('uploads', filename)
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
 
-@app.route('/')
+@api.route('/')
 def index():
     return send_from_directory('templates', 'seller_upload.html')
 
-@app.route('/seller-upload')
+@api.route('/seller-upload')
 def seller_upload():
     return send_from_directory('templates', 'seller_upload.html')
 
 # API routes
-@app.route('/api/health')
+@api.route('/api/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -39,54 +222,67 @@ def health_check():
         'version': '1.0.0'
     })
 
-@app.route('/api/dashboard')
+@api.route('/metrics')
+def get_metrics():
+    """Request and internal timings in the Prometheus text format (METRICS_ENABLED)"""
+    if not metrics.ENABLED:
+        return jsonify({'success': False, 'error': 'Metrics are disabled'}), 404
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+@api.route('/api/dashboard')
+@cached_response
 def get_dashboard_stats():
+    svc = services()
     try:
         return jsonify({
             'success': True,
-            'data': data.get_dashboard_stats()
+            'data': svc.data.get_dashboard_stats()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Artisan endpoints
-@app.route('/api/artisans')
+@api.route('/api/artisans')
+@cached_response
 def get_artisans():
+    svc = services()
     craft = request.args.get('craft_type') 
     verified = request.args.get('verified') == 'true'
     
     try:
-        all_artisans = data.get_all_artisans()
-        
-        # Apply filters if needed
-        result = all_artisans
-        if craft:
-            result = [a for a in result if a.craft_type.lower() == craft.lower()]
-        if verified:
-            result = [a for a in result if a.verified]
-        
-        # Return response
-        return jsonify({
-            'success': True,
-            'data': [a.to_dict() for a in result],
-            'count': len(result)
-        })
+        fields = parse_fields(request.args.get('fields'), Artisan.FIELDS)
+        listing = svc.data.list_artisans(
+            craft_type=craft,
+            verified=verified,
+            sort=request.args.get('sort'),
+            limit=parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        return json_list_response([_fragment(a, fields) for a in listing['items']], listing)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/artisans/<artisan_id>')
+@api.route('/api/artisans/<artisan_id>')
+@cached_response
 def get_artisan(artisan_id):
+    svc = services()
     try:
-        artisan = data.get_artisan_by_id(artisan_id)
+        artisan = svc.data.get_artisan_by_id(artisan_id)
         if not artisan:
             return jsonify({'success': False, 'error': 'Artisan not found'}), 404
             
-        return jsonify({'success': True, 'data': artisan.to_dict()})
+        return json_record_response(artisan)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/artisans', methods=['POST'])
+@api.route('/api/artisans', methods=['POST'])
 def create_artisan():
+    svc = services()
     try:
         # Get request data
         req = request.json
@@ -100,7 +296,7 @@ def create_artisan():
                 return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
         
         # Check if email already exists
-        if data.get_artisan_by_email(req['email']):
+        if svc.data.get_artisan_by_email(req['email']):
             return jsonify({'success': False, 'error': 'Email already registered'}), 409
         
         # Create artisan object
@@ -114,55 +310,44 @@ def create_artisan():
             experience_years=req.get('experience_years', 0)
         )
         
-        data.create_artisan(artisan)
+        svc.data.create_artisan(artisan)
         
         return jsonify({'success': True, 'data': artisan.to_dict()}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/artisans/<artisan_id>', methods=['PUT'])
+@api.route('/api/artisans/<artisan_id>', methods=['PUT'])
 def update_artisan(artisan_id):
+    svc = services()
     try:
-        # Get existing artisan
-        artisan = data.get_artisan_by_id(artisan_id)
-        if not artisan:
-            return jsonify({'success': False, 'error': 'Artisan not found'}), 404
-        
         # Get request data
         req = request.json
         if not req:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Update fields
-        if 'name' in req:
-            artisan.name = req['name']
-        if 'phone' in req:
-            artisan.phone = req['phone']
-        if 'craft_type' in req:
-            artisan.craft_type = req['craft_type']
-        if 'location' in req:
-            artisan.location = req['location']
-        if 'bio' in req:
-            artisan.bio = req['bio']
+        # Only the submitted fields - applied to the current record, so counters stay the server's
+        changes = {field: req[field] for field in ('name', 'phone', 'craft_type', 'location', 'bio', 'status')
+                   if field in req}
         if 'experience_years' in req:
-            artisan.experience_years = int(req['experience_years'])
+            changes['experience_years'] = int(req['experience_years'])
         if 'verified' in req:
-            artisan.verified = bool(req['verified'])
-        if 'status' in req:
-            artisan.status = req['status']
+            changes['verified'] = bool(req['verified'])
         
         # Update in "database"
-        updated = data.update_artisan(artisan)
+        updated = svc.data.update_artisan_fields(artisan_id, changes)
+        if not updated:
+            return jsonify({'success': False, 'error': 'Artisan not found'}), 404
         
         return jsonify({'success': True, 'data': updated.to_dict()})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/artisans/<artisan_id>/profile-image', methods=['POST'])
+@api.route('/api/artisans/<artisan_id>/profile-image', methods=['POST'])
 def upload_profile_image(artisan_id):
+    svc = services()
     try:
         # Check if artisan exists
-        artisan = data.get_artisan_by_id(artisan_id)
+        artisan = svc.data.get_artisan_by_id(artisan_id)
         if not artisan:
             return jsonify({'success': False, 'error': 'Artisan not found'}), 404
         
@@ -172,69 +357,145 @@ def upload_profile_image(artisan_id):
             
         file = request.files['image']
         
-        # Upload and process image
-        result = files.upload_profile_image(file, artisan_id)
+        # Save it now, resize in the background
+        staged = svc.images.stage_profile_image(file)
+        if not staged['success']:
+            return jsonify(staged), 400
         
-        if not result['success']:
-            return jsonify(result), 400
-            
-        # Update artisan with new image URL
-        artisan.profile_image = result['url']
-        data.update_artisan(artisan)
+        def finish(path):
+            # Store it, then point the artisan at it
+            url = svc.images.publish_profile_image(staged, path)
+            if svc.data.set_profile_image(artisan_id, url) is None:
+                raise ValueError('Artisan no longer exists')
+            return url
         
-        return jsonify(result)
+        return queue_image_job(svc, staged, 'profile', artisan_id, svc.images.profile_task(staged), finish)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Product endpoints
-@app.route('/api/products')
+@api.route('/api/products')
+@cached_response
 def get_products():
+    svc = services()
+    # Get filter params
+    category = request.args.get('category')
+    artisan_id = request.args.get('artisan_id')
+    search = request.args.get('search')
+    featured = request.args.get('featured') == 'true'
+    status = request.args.get('status', 'active')
+    
     try:
-        # Get filter params
-        category = request.args.get('category')
-        artisan_id = request.args.get('artisan_id')
-        search = request.args.get('search')
-        featured = request.args.get('featured') == 'true'
-        status = request.args.get('status', 'active')
-        
-        # Get products based on primary filter
-        if search:
-            products = data.search_products(search)
-        elif category:
-            products = data.get_products_by_category(category)
-        elif artisan_id:
-            products = data.get_products_by_artisan(artisan_id)
-        else:
-            products = data.get_all_products()
-        
-        # Apply secondary filters
-        if featured:
-            products = [p for p in products if p.featured]
-        
-        if status != 'all':
-            products = [p for p in products if p.status == status]
-        
-        return jsonify({
-            'success': True,
-            'data': [p.to_dict() for p in products],
-            'count': len(products)
-        })
+        fields = parse_fields(request.args.get('fields'), Product.OUTPUT_FIELDS)
+        # Category wins over artisan_id, as before; search ranks its own results
+        listing = svc.data.list_products(
+            category=category or None,
+            artisan_id=None if category else artisan_id or None,
+            status=None if status == 'all' else status,
+            featured=featured,
+            search=search or None,
+            sort=request.args.get('sort'),
+            limit=parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        # Only the requested page gets serialized, mostly from cached fragments
+        scores = listing['scores']
+        results = [_fragment(p, fields, scores[p.id] if scores is not None else None)
+                   for p in listing['items']]
+        return json_list_response(results, listing)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>')
+# Catalog exports - streamed so memory stays flat however big the catalog gets
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def _stream_export(records, export_format, fields=None):
+    """Yield NDJSON lines or a JSON array, in ~64KB chunks"""
+    ndjson = export_format == 'ndjson'
+    if not ndjson:
+        # Get the first byte out before touching the data
+        yield b'['
+    buffer = []
+    size = 0
+    first = True
+    
+    for record in records:
+        encoded = _fragment(record, fields)
+        if ndjson:
+            piece = encoded + b'\n'
+        else:
+            piece = encoded if first else b',' + encoded
+        buffer.append(piece)
+        size += len(piece)
+        if first or size >= EXPORT_CHUNK_SIZE:
+            first = False
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    
+    if not ndjson:
+        buffer.append(b']')
+    if buffer:
+        yield b''.join(buffer)
+
+def _export_response(records, export_format, fields, name):
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    extension = 'ndjson' if export_format == 'ndjson' else 'json'
+    response = Response(stream_with_context(_stream_export(records, export_format, fields)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{extension}'
+    return response
+
+@api.route('/api/products/export')
+def export_products():
+    """Stream the whole catalog as a JSON array or NDJSON (?format=ndjson)"""
+    svc = services()
+    export_format = request.args.get('format', 'json')
+    status = request.args.get('status', 'all')
+    if export_format not in ('json', 'ndjson'):
+        return jsonify({'success': False, 'error': 'format must be json or ndjson'}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'), Product.OUTPUT_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    products = svc.data.iter_products(status=None if status == 'all' else status)
+    return _export_response(products, export_format, fields, 'products')
+
+@api.route('/api/artisans/export')
+def export_artisans():
+    """Stream every artisan as a JSON array or NDJSON (?format=ndjson)"""
+    svc = services()
+    export_format = request.args.get('format', 'json')
+    if export_format not in ('json', 'ndjson'):
+        return jsonify({'success': False, 'error': 'format must be json or ndjson'}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'), Artisan.FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return _export_response(svc.data.iter_artisans(), export_format, fields, 'artisans')
+
+@api.route('/api/products/<product_id>')
+@cached_response
 def get_product(product_id):
+    svc = services()
     try:
-        product = data.get_product_by_id(product_id)
+        product = svc.data.get_product_by_id(product_id)
         if not product:
             return jsonify({'success': False, 'error': 'Product not found'}), 404
             
-        return jsonify({'success': True, 'data': product.to_dict()})
+        return json_record_response(product)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/products', methods=['POST'])
+@api.route('/api/products', methods=['POST'])
 def create_product():
+    svc = services()
     try:
         # Get request data
         req = request.json
@@ -248,7 +509,7 @@ def create_product():
                 return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
         
         # Check if artisan exists
-        if not data.get_artisan_by_id(req['artisan_id']):
+        if not svc.data.artisan_exists(req['artisan_id']):
             return jsonify({'success': False, 'error': 'Artisan not found'}), 404
         
         # Create product object
@@ -266,62 +527,46 @@ def create_product():
         )
         
         # Save to database
-        data.create_product(product)
+        svc.data.create_product(product)
         
         return jsonify({'success': True, 'data': product.to_dict()}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>', methods=['PUT'])
+@api.route('/api/products/<product_id>', methods=['PUT'])
 def update_product(product_id):
+    svc = services()
     try:
-        # Get existing product
-        product = data.get_product_by_id(product_id)
-        if not product:
-            return jsonify({'success': False, 'error': 'Product not found'}), 404
-        
         # Get request data
         req = request.json
         if not req:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Update fields
-        if 'name' in req:
-            product.name = req['name']
-        if 'description' in req:
-            product.description = req['description']
+        # Only the submitted fields, applied to the current record
+        changes = {field: req[field] for field in ('name', 'description', 'category', 'subcategory', 'materials',
+                                                   'dimensions', 'weight', 'status', 'tags')
+                   if field in req}
         if 'price' in req:
-            product.price = float(req['price'])
-        if 'category' in req:
-            product.category = req['category']
-        if 'subcategory' in req:
-            product.subcategory = req['subcategory']
-        if 'materials' in req:
-            product.materials = req['materials']
-        if 'dimensions' in req:
-            product.dimensions = req['dimensions']
-        if 'weight' in req:
-            product.weight = req['weight']
+            changes['price'] = float(req['price'])
         if 'stock_quantity' in req:
-            product.update_stock(int(req['stock_quantity']))
-        if 'status' in req:
-            product.status = req['status']
+            changes['stock_quantity'] = int(req['stock_quantity'])
         if 'featured' in req:
-            product.featured = bool(req['featured'])
-        if 'tags' in req:
-            product.tags = req['tags']
+            changes['featured'] = bool(req['featured'])
         
-        updated = data.update_product(product)
+        updated = svc.data.update_product_fields(product_id, changes)
+        if not updated:
+            return jsonify({'success': False, 'error': 'Product not found'}), 404
         
         return jsonify({'success': True, 'data': updated.to_dict()})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>/images', methods=['POST'])
+@api.route('/api/products/<product_id>/images', methods=['POST'])
 def upload_product_image(product_id):
+    svc = services()
     try:
         # Check if product exists
-        product = data.get_product_by_id(product_id)
+        product = svc.data.get_product_by_id(product_id)
         if not product:
             return jsonify({'success': False, 'error': 'Product not found'}), 404
         
@@ -331,55 +576,175 @@ def upload_product_image(product_id):
             
         file = request.files['image']
         
-        # Upload and process image
-        result = files.upload_product_image(file, product_id)
+        # Save it now, resize in the background
+        staged = svc.images.stage_product_image(file)
+        if not staged['success']:
+            return jsonify(staged), 400
         
-        if not result['success']:
-            return jsonify(result), 400
-            
-        # Add image URL to product
-        product.add_image(result['url'])
-        data.update_product(product)
+        def finish(paths):
+            # Store the variants, then add the image URL to the product
+            svc.images.publish_product_image(staged, paths)
+            return attach_product_image(svc, product_id, staged)
+        
+        # Every size and format gets built; the product keeps the 800px JPEG URL
+        return queue_image_job(svc, staged, 'product', product_id, svc.images.product_task(staged), finish)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/products/<product_id>/images/batch', methods=['POST'])
+def upload_product_images_batch(product_id):
+    """Several images in one request: processed side by side, saved to the product in one write"""
+    svc = services()
+    try:
+        if not svc.data.get_product_by_id(product_id):
+            return jsonify({'success': False, 'error': 'Product not found'}), 404
         
-        return jsonify(result)
+        uploads = [f for f in request.files.getlist('images') if f and f.filename]
+        if not uploads:
+            return jsonify({'success': False, 'error': 'No image files provided'}), 400
+        max_images = current_app.config['MAX_BATCH_IMAGES']
+        if len(uploads) > max_images:
+            return jsonify({'success': False, 'error': f'At most {max_images} images per request'}), 400
+        
+        ready, pending, rejected = [], [], []
+        for file in uploads:
+            staged = svc.images.stage_product_image(file)
+            if not staged['success']:
+                rejected.append({'filename': file.filename, 'error': staged['error']})
+            elif staged['cached']:
+                ready.append(staged)
+            else:
+                pending.append(staged)
+        
+        if not ready and not pending:
+            return jsonify({'success': False, 'error': 'None of the images could be used',
+                            'rejected': rejected}), 400
+        
+        if not pending:
+            # Every image was seen before - nothing to process
+            return jsonify({
+                'success': True,
+                'urls': attach_product_images(svc, product_id, ready),
+                'rejected': rejected,
+                'deduplicated': True
+            })
+        
+        def finish(outcomes):
+            done = list(ready)
+            errors = []
+            for staged, outcome in zip(pending, outcomes):
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    svc.images.publish_product_image(staged, outcome)
+                    done.append(staged)
+                except Exception as e:
+                    errors.append({'url': staged['url'], 'error': str(e)})
+            if not done:
+                raise ValueError('None of the images could be processed')
+            return {'urls': attach_product_images(svc, product_id, done), 'errors': errors}
+        
+        items = [(svc.images.product_task(staged), staged['content_key'], staged['raw_path'])
+                 for staged in pending]
+        job = svc.image_jobs.submit_batch('product_batch', product_id, items, finish,
+                                      urls=[staged['url'] for staged in ready + pending])
+        if job is None:
+            for staged in pending:
+                svc.images.discard(staged)
+            return jsonify({'success': False, 'error': 'Too many images being processed, try again shortly'}), 503
+        
+        return jsonify({
+            'success': True,
+            'urls': job['urls'],
+            'rejected': rejected,
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': f"/api/jobs/{job['id']}"
+        }), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/enhance-description-preview', methods=['POST'])
+PREVIEW_FIELDS = ['description', 'product_name', 'craft_type', 'materials']
+
+def preview_request_problem(req):
+    """Why a description preview request can't be served, or None"""
+    if not req:
+        return 'No data provided'
+    for field in PREVIEW_FIELDS:
+        if field not in req:
+            return f'Missing required field: {field}'
+    return None
+
+def preview_response(req, enhanced_description):
+    return {
+        'success': True,
+        'original_description': req['description'],
+        'enhanced_description': enhanced_description,
+        'ai_powered': True
+    }
+
+@api.route('/api/enhance-description-preview', methods=['POST'])
 def enhance_description_preview():
     """Enhance description without saving to database (for inline preview)"""
+    svc = services()
     try:
         req = request.json
-        if not req:
-            return jsonify({'success': False, 'error': 'No data provided'}), 400
-        
-        required = ['description', 'product_name', 'craft_type', 'materials']
-        for field in required:
-            if field not in req:
-                return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
+        problem = preview_request_problem(req)
+        if problem:
+            return jsonify({'success': False, 'error': problem}), 400
         
-        enhanced_description = google_service.enhance_product_description(
-            req['description'], 
-            req['product_name'], 
-            req['craft_type'], 
-            req['materials']
+        enhanced_description = svc.google_service.enhance_product_description(
+            *(req[field] for field in PREVIEW_FIELDS)
         )
         
+        return jsonify(preview_response(req, enhanced_description))
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/products/enhance-descriptions', methods=['POST'])
+def start_description_batch():
+    """Rewrite every product's description with Gemini in the background (resumes a stopped run)"""
+    svc = services()
+    try:
+        req = request.get_json(silent=True) or {}
+        # Checked here - a bad value would only fail later, in the background thread
+        limit = req.get('limit')
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+            return jsonify({'success': False, 'error': 'limit must be a whole number of at least 1'}), 400
+        status = req.get('status')
+        if status is not None and not isinstance(status, str):
+            return jsonify({'success': False, 'error': 'status must be a string'}), 400
+        if svc.description_batch.running():
+            return jsonify({'success': False, 'error': 'A description batch is already running'}), 409
+        
+        def run():
+            try:
+                svc.description_batch.run(limit=limit, status=status, restart=bool(req.get('restart')))
+            except Exception as e:
+                print(f"❌ Description batch failed: {e}")
+        
+        threading.Thread(target=run, name='description-batch', daemon=True).start()
         return jsonify({
             'success': True,
-            'original_description': req['description'],
-            'enhanced_description': enhanced_description,
-            'ai_powered': True
-        })
-        
+            'status_url': '/api/products/enhance-descriptions'
+        }), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@api.route('/api/products/enhance-descriptions')
+def get_description_batch():
+    """Progress of the description batch"""
+    svc = services()
+    return jsonify({'success': True, 'data': svc.description_batch.status()})
+
 # Utility endpoints
-@app.route('/api/categories')
+@api.route('/api/categories')
+@cached_response
 def get_categories():
+    svc = services()
     try:
-        categories = data.get_categories()
+        categories = svc.data.get_categories()
         return jsonify({
             'success': True,
             'data': categories
@@ -387,60 +752,173 @@ def get_categories():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/craft-types')
+@api.route('/api/craft-types')
+@cached_response
 def get_craft_types():
+    svc = services()
     try:
-        craft_types = data.get_craft_types()
+        craft_types = svc.data.get_craft_types()
         return jsonify({
             'success': True,
             'data': craft_types
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
-@app.route('/api/products/<product_id>/images/enhanced', methods=['POST'])
+@api.route('/api/products/<product_id>/images/enhanced', methods=['POST'])
 def upload_enhanced_product_image(product_id):
     """Upload product image with Google AI enhancement"""
+    # Same pipeline and storage as every other upload now - kept for existing clients
+    return upload_product_image(product_id)
+
+# Longest a status request may wait for its job to finish (?wait=seconds)
+MAX_JOB_WAIT = 30
+
+def job_wait_seconds(value):
     try:
-        product = data.get_product_by_id(product_id)
-        if not product:
-            return jsonify({'success': False, 'error': 'Product not found'}), 404
-        if 'image' not in request.files:
-            return jsonify({'success': False, 'error': 'No image file provided'}), 400
-            
-        file = request.files['image']
-        
-        result = google_service.upload_product_image(file, product_id)
-        
-        if not result['success']:
-            return jsonify(result), 400
-            
-        product.add_image(result['url'])
-        data.update_product(product)
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return min(max(float(value or 0), 0), MAX_JOB_WAIT)
+    except ValueError:
+        return 0
+
+def job_finished(job):
+    return job is None or job['status'] in ('done', 'failed')
+
+@api.route('/api/jobs/<job_id>')
+def get_job_status(job_id):
+    """Progress of a background image job; ?wait=N holds on up to N seconds for it to finish"""
+    svc = services()
+    deadline = time.monotonic() + job_wait_seconds(request.args.get('wait'))
+    job = svc.image_jobs.get(job_id)
+    while not job_finished(job) and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = svc.image_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'data': job})
 
 # Error handlers
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({
         'success': False,
         'error': 'Endpoint not found'
     }), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({
         'success': False,
         'error': 'Internal server error'
     }), 500
 
+# Async serving (see asgi.py). The routes that spend their time waiting -
+# on Gemini, or on an image job's upload - run on the event loop and hold
+# no thread while they wait. Everything else is the Flask views above.
+async def _read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+async def _send_json(send, payload, status=200):
+    body = encode_json(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                    # What flask-cors adds to the Flask routes
+                    (b'access-control-allow-origin', b'*')]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def enhance_description_preview_async(scope, receive, send, svc):
+    try:
+        body = await _read_body(receive)
+        try:
+            req = decode_json(body) if body else None
+        except ValueError:
+            return await _send_json(send, {'success': False, 'error': 'Invalid JSON'}, 400)
+        problem = preview_request_problem(req)
+        if problem:
+            return await _send_json(send, {'success': False, 'error': problem}, 400)
+        
+        enhanced_description = await svc.google_service.enhance_product_description_async(
+            *(req[field] for field in PREVIEW_FIELDS)
+        )
+        await _send_json(send, preview_response(req, enhanced_description))
+    except Exception as e:
+        await _send_json(send, {'success': False, 'error': str(e)}, 500)
+
+async def get_job_status_async(scope, receive, send, svc, job_id):
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    deadline = time.monotonic() + job_wait_seconds(query.get('wait', [None])[0])
+    job = svc.image_jobs.get(job_id)
+    while not job_finished(job) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        job = svc.image_jobs.get(job_id)
+    if not job:
+        return await _send_json(send, {'success': False, 'error': 'Job not found'}, 404)
+    await _send_json(send, {'success': True, 'data': job})
+
+# (method, path parts) - a part in <> matches anything and is passed on by name
+ASYNC_ROUTES = [
+    ('POST', ('api', 'enhance-description-preview'), enhance_description_preview_async),
+    ('GET', ('api', 'jobs', '<job_id>'), get_job_status_async),
+]
+
+def _match_async_route(method, path):
+    parts = tuple(path.strip('/').split('/'))
+    for route_method, pattern, handler in ASYNC_ROUTES:
+        if route_method != method or len(pattern) != len(parts):
+            continue
+        params = {}
+        for want, got in zip(pattern, parts):
+            if want.startswith('<'):
+                params[want[1:-1]] = got
+            elif want != got:
+                break
+        else:
+            return handler, params, '/' + '/'.join(pattern)
+    return None, None, None
+
+def create_asgi_app(flask_app):
+    """ASGI app serving ASYNC_ROUTES itself and every other request through flask_app.
+
+    The Flask views run on a thread pool, after the request body has been
+    read in full - a slow upload doesn't hold a thread while it arrives.
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    
+    flask_asgi = WsgiToAsgi(flask_app)
+    svc = services(flask_app)
+    
+    async def asgi_app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # Nothing to set up or tear down - the services were built with the app
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        
+        if scope['type'] == 'http':
+            handler, params, route = _match_async_route(scope['method'], scope['path'])
+            if handler is not None:
+                return await metrics.observe_asgi(route, scope, receive, send, handler, svc=svc, **params)
+        await flask_asgi(scope, receive, send)
+    
+    return asgi_app
+
 if __name__ == '__main__':
     
     print("Starting KALA KAKSH Backend...")
     print("Health Check: http://localhost:5000/api/health")
     print("Dashboard: http://localhost:5000/api/dashboard")
     
-    # Run the app
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Run the app (the development server - see gunicorn.conf.py for production)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
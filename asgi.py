@@ -0,0 +1,14 @@
+"""Async entry point, for the routes that mostly wait on the network.
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+
+The same preloaded app as wsgi.py, served by uvicorn workers. The
+description preview and job status long polls (/api/jobs/<id>?wait=N)
+await Gemini and the image jobs on the event loop; every other route is
+the usual Flask view on a thread pool (see create_asgi_app in app.py).
+"""
+from app import create_app, create_asgi_app, preload
+
+flask_app = create_app()
+preload(flask_app)
+app = create_asgi_app(flask_app)
@@ -0,0 +1,200 @@
+"""Sync vs async workers while the description preview waits on Gemini.
+
+    python -m benchmarks.async_serving --workers 2 --clients 64 --latency 0.5
+
+Runs the app under gunicorn twice with the same number of worker
+processes: 'sync' is wsgi-style gthread workers (--threads each), 'async'
+is create_asgi_app on uvicorn workers. Gemini is a stand-in that waits
+--latency seconds per call, through generate_content or
+generate_content_async like the real model. For --seconds, --clients
+clients send previews (every one different, so nothing is cached) while
+--readers clients read the catalog. Reported: preview throughput and
+latency, catalog read latency, and the resident memory of all the
+server's processes.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import itertools
+import threading
+import statistics
+import subprocess
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowModel:
+    """Stands in for genai.GenerativeModel: waits, then answers"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return StubResponse(f"[stub] {len(prompt)}")
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        return StubResponse(f"[stub] {len(prompt)}")
+
+
+def _build():
+    import app as backend
+    from services.google_cloud_service import GoogleCloudService
+
+    flask_app = backend.create_app()
+    svc = backend.services(flask_app)
+    svc.google_service = GoogleCloudService(
+        svc.blob_storage, gemini_model=SlowModel(float(os.environ['BENCH_LATENCY'])))
+    backend.preload(flask_app)
+    return flask_app
+
+
+# Server side: gunicorn loads these, e.g. "benchmarks.async_serving:sync_app()"
+def sync_app():
+    return _build()
+
+
+def async_app():
+    from app import create_asgi_app
+    return create_asgi_app(_build())
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def start_server(mode, port, args):
+    env = dict(os.environ,
+               PORT=str(port),
+               WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads),
+               GUNICORN_WORKER_CLASS='uvicorn.workers.UvicornWorker' if mode == 'async' else 'gthread',
+               BENCH_LATENCY=str(args.latency),
+               AI_TIMEOUT='120',
+               GOOGLE_API_KEY='')
+    server = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', f'benchmarks.async_serving:{mode}_app()'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if request(port, 'GET', '/api/health') == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def rss_mb(pid):
+    """Resident memory of pid and its children"""
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except OSError:
+                pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+def run_load(port, args):
+    stop = time.monotonic() + args.seconds
+    counter = itertools.count()
+    previews, reads, failures = [], [], []
+
+    def previewer():
+        while time.monotonic() < stop:
+            body = json.dumps({'description': f'hand painted vase {next(counter)}', 'product_name': 'Vase',
+                               'craft_type': 'Pottery', 'materials': ['Clay']})
+            start = time.perf_counter()
+            status = request(port, 'POST', '/api/enhance-description-preview', body)
+            (previews if status == 200 else failures).append(time.perf_counter() - start)
+
+    def reader():
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            status = request(port, 'GET', '/api/products?limit=20')
+            (reads if status == 200 else failures).append(time.perf_counter() - start)
+
+    threads = ([threading.Thread(target=previewer) for _ in range(args.clients)] +
+               [threading.Thread(target=reader) for _ in range(args.readers)])
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return previews, reads, failures
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    return sorted(values)[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='threads per sync worker')
+    parser.add_argument('--clients', type=int, default=64, help='clients sending previews')
+    parser.add_argument('--readers', type=int, default=4, help='clients reading the catalog')
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per model call')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.clients} preview clients, {args.readers} readers, "
+          f"model latency {args.latency}s")
+    print(f"{'mode':<6} {'previews/s':>10} {'preview p50':>12} {'read p50 ms':>12} {'read p99 ms':>12} "
+          f"{'reads/s':>8} {'failed':>7} {'rss MB':>7}")
+    for mode in ('sync', 'async'):
+        port = free_port()
+        server = start_server(mode, port, args)
+        try:
+            previews, reads, failures = run_load(port, args)
+            rss = rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:<6} {len(previews) / args.seconds:>10.1f} {statistics.median(previews or [0]):>11.2f}s "
+              f"{percentile(reads, 50) * 1000:>12.1f} {percentile(reads, 99) * 1000:>12.1f} "
+              f"{len(reads) / args.seconds:>8.0f} {len(failures):>7} {rss:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
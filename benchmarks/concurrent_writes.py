@@ -0,0 +1,90 @@
+"""Stress test: many processes and threads creating products at once.
+
+    python -m benchmarks.concurrent_writes --engine wal --processes 4 --threads 8 --per-thread 100
+
+Runs against a throwaway copy of data/ and fails if any product or any
+artisan.total_products increment went missing.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.product import Product
+from services.catalog_store import CatalogStore
+from services.data_service import create_data_service
+
+
+def _worker(data_dir, engine, artisan_id, threads, per_thread):
+    # Each forked worker gets its own store, like a gunicorn worker would
+    CatalogStore._instances.clear()
+    data = create_data_service(data_dir, engine)
+
+    def create_many():
+        for i in range(per_thread):
+            data.create_product(Product(artisan_id, f"Stress item {i}", "Stress test product", 100, "Stress"))
+
+    pool = [threading.Thread(target=create_many) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--engine', default='json', choices=['json', 'wal', 'sqlite'])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--per-thread', type=int, default=100)
+    args = parser.parse_args()
+
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    data_dir = tempfile.mkdtemp(prefix='kala-kaksh-stress-')
+    for name in ('artisans.json', 'products.json'):
+        shutil.copy(os.path.join(source, name), data_dir)
+
+    if args.engine == 'sqlite':
+        from config import Config
+        Config.SQLITE_PATH = os.path.join(data_dir, 'kala_kaksh.db')
+
+    data = create_data_service(data_dir, args.engine)
+    artisan = data.get_all_artisans()[0]
+    products_before = len(data.get_all_products())
+    count_before = artisan.total_products
+    expected = args.processes * args.threads * args.per_thread
+
+    started = time.perf_counter()
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_worker, args=(data_dir, args.engine, artisan.id, args.threads, args.per_thread))
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    # Fresh view of what actually reached disk
+    CatalogStore._instances.clear()
+    data = create_data_service(data_dir, args.engine)
+    products_added = len(data.get_all_products()) - products_before
+    count_added = data.get_artisan_by_id(artisan.id).total_products - count_before
+
+    print(f"engine={args.engine} creates={expected} time={elapsed:.2f}s ({expected / elapsed:.0f}/s)")
+    print(f"products added: {products_added}, artisan.total_products added: {count_added}")
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    if products_added != expected or count_added != expected:
+        print("LOST UPDATES")
+        sys.exit(1)
+    print("OK - no lost updates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Description previews against a stub Gemini model.
+
+    python -m benchmarks.description_cache --requests 60 --threads 12 --latency 0.5
+
+Simulates the inline preview: --threads clients sending --requests
+previews spread over --distinct inputs (editing mostly re-sends the same
+text). 'uncached' calls the model every time, like before; 'cached'
+goes through GoogleCloudService's cache and single-flight. The last
+case makes the model slower than --timeout to show requests coming back
+with the fallback on time.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.blob_storage import MemoryBlobStorage
+from services.google_cloud_service import GoogleCloudService
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: sleeps, then echoes a digest of the prompt"""
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return StubResponse(f"  Generated for {hash(prompt)}  ")
+
+
+def previews(count, distinct):
+    return [(f"hand-thrown clay pot number {i % distinct}", 'Clay Pot', 'Pottery', ['clay', 'glaze'])
+            for i in range(count)]
+
+
+def run(enhance, inputs, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda args: enhance(*args), inputs))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--distinct', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=12)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=0.2)
+    args = parser.parse_args()
+
+    inputs = previews(args.requests, args.distinct)
+    print(f"{args.requests} previews, {args.distinct} distinct, {args.threads} clients, "
+          f"{args.latency * 1000:.0f} ms per model call\n")
+    print(f"{'case':<10} {'seconds':>8} {'model calls':>12}")
+
+    model = StubModel(args.latency)
+    uncached, expected = run(lambda *a: model.generate_content(repr(a)).text.strip(), inputs, args.threads)
+    print(f"{'uncached':<10} {uncached:>8.2f} {model.calls:>12}")
+
+    model = StubModel(args.latency)
+    service = GoogleCloudService(MemoryBlobStorage(), gemini_model=model)
+    cached, results = run(service.enhance_product_description, inputs, args.threads)
+    print(f"{'cached':<10} {cached:>8.2f} {model.calls:>12}  ({uncached / cached:.0f}x)")
+    assert model.calls == args.distinct, model.calls
+    assert len(set(results)) == args.distinct
+
+    # Model slower than the timeout: everyone gets the fallback, nobody waits for the model
+    model = StubModel(args.timeout * 5)
+    service = GoogleCloudService(MemoryBlobStorage(), gemini_model=model)
+    service.ai_timeout = args.timeout
+    slow, results = run(service.enhance_product_description, inputs[:args.threads], args.threads)
+    print(f"{'timeout':<10} {slow:>8.2f} {model.calls:>12}  (model takes {model.latency:.1f}s, "
+          f"timeout {args.timeout:.1f}s)")
+    assert slow < model.latency
+    assert all(r.startswith('This exquisite') for r in results)
+
+
+if __name__ == '__main__':
+    main()
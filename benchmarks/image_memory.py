@@ -0,0 +1,111 @@
+"""Peak memory of decoding and resizing one large upload.
+
+    python -m benchmarks.image_memory --width 6000 --height 4000
+
+Each case runs in its own subprocess so ru_maxrss measures only that
+case. 'full-decode' is the old request-thread path (read the whole
+upload into bytes, decode it at full size, then thumbnail); the
+others go through services.image_processing with draft-mode decoding.
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from services import image_processing
+
+CASES = ('full-decode', 'bounded', 'variants-no-draft', 'variants')
+
+
+def make_photo(path, width, height):
+    """A JPEG that compresses like a photo (noise over a gradient), not a flat colour"""
+    noise = Image.effect_noise((width // 4, height // 4), 40).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((width // 4, height // 4)).convert('RGB')
+    Image.blend(noise, gradient, 0.5).resize((width, height)).save(path, 'JPEG', quality=92)
+
+
+def run_case(case, src, workdir):
+    if case == 'full-decode':
+        with open(src, 'rb') as f:
+            data = f.read()
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        img = img.convert('RGB')
+        img.thumbnail((800, 600), Image.Resampling.LANCZOS)
+        img.save(os.path.join(workdir, 'out.jpg'), 'JPEG', quality=85, optimize=True)
+    elif case == 'bounded':
+        image_processing.resize_image(src, os.path.join(workdir, 'out.jpg'), 800, 600, 85)
+    elif case == 'variants-no-draft':
+        opener = image_processing.open_image
+
+        def full_size(path, target_size=None, max_pixels=None):
+            img = opener(path, None, max_pixels)
+            img.load()
+            return img
+
+        image_processing.open_image = full_size
+        image_processing.make_variants(src, os.path.join(workdir, 'variants'), 85)
+    elif case == 'variants':
+        image_processing.make_variants(src, os.path.join(workdir, 'variants'), 85)
+
+
+def child(case, src):
+    workdir = tempfile.mkdtemp()
+    try:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        run_case(case, src, workdir)
+        elapsed = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux
+        print(f"{(after - before) / 1024:.1f} {elapsed * 1000:.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--case', choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument('--src', help=argparse.SUPPRESS)
+    parser.add_argument('--make', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.make:
+        make_photo(args.src, args.width, args.height)
+        return
+    if args.case:
+        child(args.case, args.src)
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    try:
+        src = os.path.join(tmp, 'photo.jpg')
+        # Also in a subprocess: children start out with our peak RSS, so keep it small
+        subprocess.run([sys.executable, '-m', 'benchmarks.image_memory', '--make', '--src', src,
+                        '--width', str(args.width), '--height', str(args.height)], check=True, cwd=root)
+        size_mb = os.path.getsize(src) / (1024 * 1024)
+        full_mb = args.width * args.height * 3 / (1024 * 1024)
+        print(f"{args.width}x{args.height} JPEG, {size_mb:.1f} MB on disk, {full_mb:.0f} MB as RGB pixels\n")
+        print(f"{'case':<20} {'peak MB':>8} {'ms':>7}")
+        for case in CASES:
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.image_memory', '--case', case, '--src', src],
+                                 capture_output=True, text=True, check=True, cwd=root)
+            peak, ms = out.stdout.split()
+            print(f"{case:<20} {float(peak):>8.1f} {int(ms):>7}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
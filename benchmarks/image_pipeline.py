@@ -0,0 +1,91 @@
+"""Product image uploads through ImagePipeline, per storage backend.
+
+    python -m benchmarks.image_pipeline --images 12 --width 3000 --height 2000
+
+Each backend gets the same photos, staged and processed exactly like the
+upload routes do (worker pool, then publish from the finisher thread).
+'memory' keeps the results in a dict, so its time is the processing
+cost on its own; 'local' adds moving files into place, and 'gcs' uploads
+to an in-process fake bucket with --latency per request.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.datastructures import FileStorage
+from benchmarks.image_memory import make_photo
+from benchmarks.gcs_uploads import FakeBucket
+from services.blob_storage import LocalBlobStorage, GCSBlobStorage, MemoryBlobStorage
+from services.image_jobs import ImageJobQueue
+from services.image_pipeline import ImagePipeline
+
+BACKENDS = ('memory', 'local', 'gcs')
+
+
+def make_storage(backend, root, latency):
+    if backend == 'memory':
+        return MemoryBlobStorage()
+    if backend == 'local':
+        return LocalBlobStorage(os.path.join(root, 'uploads'))
+    return GCSBlobStorage(bucket=FakeBucket(latency=latency))
+
+
+def run(backend, photos, root, args):
+    storage = make_storage(backend, root, args.latency)
+    pipeline = ImagePipeline(storage, os.path.join(root, 'incoming'), os.path.join(root, 'refs'))
+    jobs = ImageJobQueue(os.path.join(root, 'jobs'), args.workers, max_pending=len(photos) + 1)
+
+    start = time.perf_counter()
+    submitted = []
+    for photo in photos:
+        with open(photo, 'rb') as f:
+            staged = pipeline.stage_product_image(FileStorage(f, filename='photo.jpg'))
+        assert staged['success'] and not staged['cached'], staged
+        job = jobs.submit('product', 'bench', pipeline.product_task(staged),
+                          lambda paths, staged=staged: pipeline.publish_product_image(staged, paths),
+                          url=staged['url'], key=staged['content_key'], discard=staged['raw_path'])
+        submitted.append(job['id'])
+    jobs.wait()
+    elapsed = time.perf_counter() - start
+    jobs.shutdown()
+
+    failed = [job_id for job_id in submitted if jobs.get(job_id)['status'] != 'done']
+    assert not failed, f"{len(failed)} jobs failed"
+    stored = len(list(storage.list('images')))
+    return elapsed, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=12)
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake bucket seconds per request')
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        photos = []
+        for i in range(args.images):
+            photos.append(os.path.join(tmp, f"photo{i}.jpg"))
+            make_photo(photos[-1], args.width, args.height)
+        print(f"{args.images} photos, {args.width}x{args.height}\n")
+        print(f"{'backend':<8} {'seconds':>8} {'images/s':>9} {'objects':>8}")
+
+        for backend in args.backends.split(','):
+            root = os.path.join(tmp, backend)
+            elapsed, stored = run(backend, photos, root, args)
+            print(f"{backend:<8} {elapsed:>8.2f} {args.images / elapsed:>9.1f} {stored:>8}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""What the Prometheus metrics cost, off and on.
+
+    python -m benchmarks.metrics_overhead --records 50000 --requests 2000
+
+Each case is a fresh process (METRICS_ENABLED is read at import) that
+hydrates --records products with from_dict() - the most frequently timed
+call - and serves --requests catalog reads through the test client with
+the response cache off. Times are per call.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time, json
+from config import Config
+Config.RESPONSE_CACHE_ENABLED = False
+from models.product import Product
+from app import create_app
+
+item = Product('artisan', 'Clay Vase', 'Hand thrown', 500, 'Home Decor', materials=['Clay']).to_dict()
+start = time.perf_counter()
+for _ in range({records}):
+    Product.from_dict(item)
+hydrate = (time.perf_counter() - start) / {records}
+
+client = create_app().test_client()
+client.get('/api/products?limit=20')
+start = time.perf_counter()
+for _ in range({requests}):
+    client.get('/api/products?limit=20')
+request = (time.perf_counter() - start) / {requests}
+print(json.dumps({{'from_dict': hydrate, 'request': request}}))
+"""
+
+
+def run_case(enabled, args):
+    env = dict(os.environ, METRICS_ENABLED='true' if enabled else 'false')
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    out = subprocess.run([sys.executable, '-c', CHILD.format(records=args.records, requests=args.requests)],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'metrics':<8} {'from_dict us':>13} {'request us':>11}")
+    for name, enabled in (('off', False), ('on', True)):
+        timings = run_case(enabled, args)
+        print(f"{name:<8} {timings['from_dict'] * 1e6:>13.2f} {timings['request'] * 1e6:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Per-object memory and from_dict() time for Product/Artisan.
+
+    python -m benchmarks.model_hydration --count 100000
+
+Compares the current slotted models and their direct from_dict() path
+with the old dict-backed layout that went through __init__ (a fresh
+uuid4 and two timestamps per object, overwritten straight away).
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.product import Product
+from models.artisan import Artisan
+from utils.helpers import generate_id, get_timestamp
+
+
+class LegacyProduct:
+    """The pre-__slots__ Product, kept here only for comparison"""
+
+    def __init__(self, artisan_id, name, description, price, category,
+                 subcategory=None, materials=None, dimensions=None,
+                 weight=None, stock_quantity=1, images=None):
+        self.id = generate_id()
+        self.artisan_id = artisan_id
+        self.name = name
+        self.description = description
+        self.price = float(price)
+        self.category = category
+        self.subcategory = subcategory
+        self.materials = materials if materials else []
+        self.dimensions = dimensions
+        self.weight = weight
+        self.stock_quantity = int(stock_quantity)
+        self.images = images or []
+        self.created_at = get_timestamp()
+        self.updated_at = get_timestamp()
+        self.status = "active"
+        self.tags = []
+        self.featured = False
+
+    @classmethod
+    def from_dict(cls, data):
+        product = cls(
+            artisan_id=data['artisan_id'], name=data['name'], description=data['description'],
+            price=data['price'], category=data['category'], subcategory=data.get('subcategory'),
+            materials=data.get('materials', []), dimensions=data.get('dimensions'),
+            weight=data.get('weight'), stock_quantity=data.get('stock_quantity', 1),
+            images=data.get('images', [])
+        )
+        product.id = data['id']
+        product.created_at = data['created_at']
+        product.updated_at = data.get('updated_at', get_timestamp())
+        product.status = data.get('status', 'active')
+        product.tags = data.get('tags', [])
+        product.featured = data.get('featured', False)
+        return product
+
+
+def sample_products(count):
+    return [{
+        'id': f"p-{i}", 'artisan_id': f"a-{i % 500}", 'name': f"Handmade item {i}",
+        'description': "Hand-painted blue pottery", 'price': 100 + i % 900, 'category': "Home Decor",
+        'subcategory': None, 'materials': ["Clay"], 'dimensions': {'height': 10}, 'weight': 0.5,
+        'stock_quantity': 3, 'images': [], 'created_at': "2024-01-01T10:00:00",
+        'updated_at': "2024-01-01T10:00:00", 'status': "active", 'tags': ["pottery"], 'featured': False,
+    } for i in range(count)]
+
+
+def measure(label, model_cls, rows):
+    # Time first, then memory (tracemalloc slows allocation down)
+    started = time.perf_counter()
+    objects = [model_cls.from_dict(row) for row in rows]
+    elapsed = time.perf_counter() - started
+    del objects
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [model_cls.from_dict(row) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # Only count the instances themselves (+ their __dict__), not the shared row values
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename')
+                    if stat.size_diff > 0)
+    per_object = (allocated - sys.getsizeof(objects)) / len(rows)
+    print(f"{label:<24} {elapsed * 1000:8.1f} ms  {elapsed / len(rows) * 1e6:6.2f} us/obj  "
+          f"{per_object:7.0f} B/obj")
+    return elapsed, per_object
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = sample_products(args.count)
+    print(f"Hydrating {args.count} products")
+    legacy_time, legacy_mem = measure("legacy (dict, __init__)", LegacyProduct, rows)
+    slotted_time, slotted_mem = measure("Product (slots)", Product, rows)
+    print(f"speedup x{legacy_time / slotted_time:.1f}, memory -{(1 - slotted_mem / legacy_mem) * 100:.0f}%")
+
+    artisan_rows = [{
+        'id': f"a-{i}", 'name': "Artisan", 'email': f"a{i}@example.com", 'phone': "9876543210",
+        'craft_type': "Pottery", 'location': {'city': "Jaipur"}, 'created_at': "2024-01-01T10:00:00",
+    } for i in range(args.count)]
+    print(f"Hydrating {args.count} artisans")
+    measure("Artisan (slots)", Artisan, artisan_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Catalog search at scale: one page of ranked results.
+
+    python -m benchmarks.search_index --products 100000 --limit 24
+
+Writes --products generated products (a seeded mix of craft words, so
+some terms are in half the catalog and others in a handful of items)
+into a throwaway data dir, loads it with the json engine and times
+list_products(search=..., limit=...) the way GET /api/products?search=
+calls it, for a few kinds of query. Every page is first checked against
+the full, unpruned ranking. 'cold' is the very first search, which also
+sorts the query terms' posting lists by impact; the rest are medians and
+p99s per call after that. 'guessed' is the total a pruned page reports
+when it stopped before counting every match.
+
+Single words and prefixes stay well under a millisecond; 'two words' is
+the slow case, since every vase scores the same on 'vase' and about half
+the catalog says 'blue' somewhere.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.data_service import create_data_service
+
+ADJECTIVES = ['handmade', 'handcrafted', 'traditional', 'blue', 'red', 'painted', 'carved', 'woven',
+              'embroidered', 'rustic', 'antique', 'small', 'large', 'floral', 'tribal', 'royal']
+ITEMS = ['vase', 'bowl', 'plate', 'lamp', 'scarf', 'saree', 'shawl', 'basket', 'mirror', 'box',
+         'figurine', 'jug', 'coaster', 'rug', 'cushion', 'earrings', 'necklace', 'bangle', 'mask']
+MATERIALS = ['Clay', 'Brass', 'Silk', 'Cotton', 'Wood', 'Bamboo', 'Jute', 'Silver', 'Terracotta',
+             'Sandalwood', 'Marble', 'Natural colors']
+CRAFTS = ['pottery', 'madhubani', 'bidriware', 'pashmina', 'dhokra', 'kalamkari', 'phulkari',
+          'chikankari', 'warli', 'bandhani', 'ikat', 'pattachitra']
+FILLER = ['made', 'by', 'artisans', 'using', 'natural', 'with', 'intricate', 'designs', 'from',
+          'village', 'each', 'piece', 'unique', 'colors', 'finish', 'gift', 'home', 'decor']
+
+QUERIES = {
+    'common word': 'handmade',
+    'common prefix': 'ha',
+    'typed word': 'terrac',
+    'two words': 'blue vase',
+    'rare word': 'pattachitra mask',
+    'no match': 'zzzz',
+}
+
+
+def generate(count, seed=7):
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        item = rng.choice(ITEMS)
+        craft = rng.choice(CRAFTS) if rng.random() < 0.3 else ''
+        name = ' '.join(w for w in (rng.choice(ADJECTIVES), craft, item) if w).title()
+        words = rng.choices(FILLER + ADJECTIVES, k=rng.randint(8, 40)) + [item]
+        # A sprinkle of one-off words keeps the vocabulary realistic
+        words.append(f"sku{rng.randint(0, count)}")
+        products.append({
+            'id': f"p-{i:06d}", 'artisan_id': 'a1b2c3d4-e5f6-7890-abcd-ef1234567890', 'name': name,
+            'description': ' '.join(words), 'price': rng.randint(100, 20000), 'category': 'Home Decor',
+            'subcategory': None, 'materials': rng.sample(MATERIALS, rng.randint(1, 3)), 'dimensions': {},
+            'weight': None, 'stock_quantity': 5, 'images': [], 'created_at': "2024-01-01T10:00:00",
+            'updated_at': "2024-01-01T10:00:00", 'status': 'active' if rng.random() < 0.9 else 'draft',
+            'tags': [t for t in (craft, item) if t], 'featured': rng.random() < 0.05,
+        })
+    return products
+
+
+def timed(call, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        runs.append(time.perf_counter() - start)
+    runs.sort()
+    return statistics.median(runs), runs[min(len(runs) - 1, int(len(runs) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='kala-kaksh-search-')
+    try:
+        shutil.copy(os.path.join(ROOT, 'data', 'artisans.json'), data_dir)
+        with open(os.path.join(data_dir, 'products.json'), 'w') as f:
+            json.dump(generate(args.products), f)
+
+        start = time.perf_counter()
+        data = create_data_service(data_dir, 'json')
+        data.preload()
+        print(f"{args.products} products loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':<14} {'matches':>8} {'guessed':>8} {'cold ms':>8} {'page 1 us':>10} {'p99 us':>8} "
+              f"{'page 2 us':>10} {'p99 us':>8}")
+        for label, query in QUERIES.items():
+            start = time.perf_counter()
+            first = data.list_products(search=query, status='active', limit=args.limit)
+            cold = time.perf_counter() - start
+            second = data.list_products(search=query, status='active', limit=args.limit,
+                                        cursor=first['next_cursor'])
+
+            # The pruned pages have to be exactly what ranking everything gives
+            full = data.list_products(search=query, status='active')
+            expected = [(p.id, full['scores'][p.id]) for p in full['items']]
+            got = [(p.id, first['scores'][p.id]) for p in first['items']]
+            if first['next_cursor']:
+                got += [(p.id, second['scores'][p.id]) for p in second['items']]
+            assert got == expected[:len(got)], f"{label}: pruned ranking differs"
+            assert first['total_is_estimate'] or first['total'] == full['total'], f"{label}: total differs"
+
+            page1 = timed(lambda: data.list_products(search=query, status='active', limit=args.limit), args.repeat)
+            page2 = timed(lambda: data.list_products(search=query, status='active', limit=args.limit,
+                                                     cursor=first['next_cursor']), args.repeat)
+            guessed = first['total'] if first['total_is_estimate'] else '-'
+            print(f"{label:<14} {full['total']:>8} {guessed:>8} {cold * 1e3:>8.1f} {page1[0] * 1e6:>10.0f} {page1[1] * 1e6:>8.0f} "
+                  f"{page2[0] * 1e6:>10.0f} {page2[1] * 1e6:>8.0f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Cold start: from a fresh interpreter to the first response.
+
+    python -m benchmarks.startup --runs 5
+
+Each run is a new Python process that imports the wsgi entry point
+(building the app and preloading the catalog) and serves one catalog
+read through the test client, which is what a newly spawned worker
+does. 'sdk-eager' imports the Google SDKs first, as app used to
+at import time, for comparison. Times are medians over --runs.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time, json
+start = time.perf_counter()
+if {eager}:
+    import google.generativeai, google.cloud.storage
+import wsgi
+imported = time.perf_counter()
+response = wsgi.app.test_client().get('/api/products')
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'first': done - imported}}))
+"""
+
+
+def run_once(eager):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD.format(eager=eager)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings['total'] = total
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<10} {'import ms':>10} {'first req ms':>13} {'process ms':>11}")
+    for case, eager in (('lazy', False), ('sdk-eager', True)):
+        runs = [run_once(eager) for _ in range(args.runs)]
+        median = {key: statistics.median(r[key] for r in runs) * 1000 for key in runs[0]}
+        print(f"{case:<10} {median['import']:>10.0f} {median['first']:>13.0f} {median['total']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,10 +12,52 @@ class Config:
     DATA_DIR = 'data'
     ARTISANS_FILE = os.path.join(DATA_DIR, 'artisans.json')
     PRODUCTS_FILE = os.path.join(DATA_DIR, 'products.json')
+    # 'json' rewrites the whole file per change, 'wal' appends to a log and compacts in the background,
+    # 'sqlite' keeps everything in SQLITE_PATH (migrated from the JSON files on first start)
+    STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'json')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(DATA_DIR, 'kala_kaksh.db'))
+    
+    # Cached GET responses for catalog reads (invalidated by any write)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    
+    # Prometheus metrics on /metrics (needs prometheus_client); nothing is measured while off
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+    
+    # Background image processing (resize/encode runs in a process pool in each web worker).
+    # IMAGE_WORKERS is the total for the whole server: the WEB_CONCURRENCY workers
+    # (exported by gunicorn.conf.py) split it between them, with at least one each
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 0)) or os.cpu_count() or 1
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', 64))
+    JOBS_DIR = os.path.join(DATA_DIR, 'jobs')
+    MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 20))
+    # Larger images are rejected at upload (a 50MP RGB bitmap is ~150MB before any resizing)
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))
+    # One JPEG/WebP quality for every upload route
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 85))
+    # Gemini descriptions: cached by input, generated on AI_WORKERS helper threads (0 = in the request
+    # thread) and given up on after AI_TIMEOUT seconds in favour of the plain-text fallback
+    AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', 512))
+    AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 24 * 60 * 60))
+    AI_WORKERS = int(os.environ.get('AI_WORKERS', 4))
+    AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT', 15))
+    # Offline description rewrite (python -m services.description_batch, or POST /api/products/enhance-descriptions)
+    DESCRIPTION_BATCH_RATE = float(os.environ.get('DESCRIPTION_BATCH_RATE', 2))
+    DESCRIPTION_BATCH_CONCURRENCY = int(os.environ.get('DESCRIPTION_BATCH_CONCURRENCY', 4))
+    DESCRIPTION_BATCH_CHECKPOINT = os.path.join(DATA_DIR, 'description_batch.json')
     GOOGLE_CLOUD_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT', 'kala-kaksh-hackathon')
     GOOGLE_CLOUD_BUCKET = os.environ.get('GOOGLE_CLOUD_BUCKET', 'kala-kaksh-images')
     GOOGLE_APPLICATION_CREDENTIALS = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
     USE_GOOGLE_CLOUD = os.environ.get('USE_GOOGLE_CLOUD', 'False').lower() == 'true'
+    # Parallel uploads per process. Objects aren't made public one by one: give the bucket
+    # uniform bucket-level access with allUsers as Storage Object Viewer. STORAGE_EMULATOR_HOST
+    # points the client at a local fake-gcs-server instead.
+    GCS_UPLOAD_WORKERS = int(os.environ.get('GCS_UPLOAD_WORKERS', 8))
+    # Where processed images go: 'local' (uploads/), 'gcs' (GOOGLE_CLOUD_BUCKET) or 'memory'
+    BLOB_STORAGE = os.environ.get('BLOB_STORAGE') or ('gcs' if USE_GOOGLE_CLOUD else 'local')
     
     VERSION = '1.0.0'
     APP_NAME = 'KALA KAKSH'
@@ -0,0 +1,52 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app"""
+import gc
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# The app splits IMAGE_WORKERS between this many processes (so set the count here, not with -w)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+# Uploads and AI calls spend most of their time waiting, so each worker gets a few threads.
+# asgi:app needs uvicorn.workers.UvicornWorker instead (threads don't apply there)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Load the app (and the catalog, see wsgi.py) in the master, once, before forking
+preload_app = True
+
+# With METRICS_ENABLED, every process writes its metrics to files in here and
+# /metrics adds them up. Set before the app (and prometheus_client) is imported;
+# emptied on start so a previous run's numbers don't carry over
+if os.environ.get('METRICS_ENABLED', 'False').lower() == 'true':
+    metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                        os.path.join(tempfile.gettempdir(), 'kala-kaksh-metrics'))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+# No collections while the preloaded objects are created: a collection writes to
+# every object header it visits, which would un-share those pages in the workers
+gc.disable()
+
+
+def when_ready(server):
+    # Everything loaded so far moves to a generation the collector never scans
+    gc.freeze()
+    server.log.info("Catalog preloaded; %d objects frozen for the workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    gc.enable()
+    # Locks, connections, SDK clients and thread pools are per process
+    from app import after_fork
+    after_fork()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Its in-progress requests are over
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,16 @@
-from utils.helpers import generate_id, get_timestamp
+from utils.helpers import generate_id, get_timestamp, encode_json
+from utils.metrics import timed
 
 class Artisan:
+    # Everything to_dict() returns, in order
+    FIELDS = ('id', 'name', 'email', 'phone', 'craft_type', 'location', 'bio',
+              'experience_years', 'profile_image', 'created_at', 'updated_at', 'status',
+              'verified', 'rating', 'total_products', 'total_orders')
+    # What a PUT may change; counters like total_products are only ever kept by the server
+    EDITABLE = ('name', 'phone', 'craft_type', 'location', 'bio', 'experience_years', 'verified', 'status')
+    # No per-instance __dict__ - the catalog keeps every artisan resident
+    __slots__ = FIELDS + ('_json_fragment',)
+
     def __init__(self, name, email, phone, craft_type, location, 
                  bio=None, experience_years=0):
         # Basic info
@@ -14,8 +24,9 @@ class Artisan:
         self.experience_years = int(experience_years) if experience_years else 0
         
         self.profile_image = None
-        self.created_at = get_timestamp()
-        self.updated_at = get_timestamp()
+        now = get_timestamp()
+        self.created_at = now
+        self.updated_at = now
         self.status = "active"
         self.verified = False
         
@@ -23,7 +34,21 @@ class Artisan:
         self.total_products = 0
         self.total_orders = 0
         
-    def to_dict(self):
+    def to_json(self):
+        """to_dict() as encoded JSON bytes, cached until updated_at changes"""
+        cached = getattr(self, '_json_fragment', None)
+        if cached is None or cached[0] != self.updated_at:
+            cached = self._json_fragment = (self.updated_at, encode_json(self.to_dict()))
+        return cached[1]
+
+    def invalidate_json(self):
+        """Drop the cached fragment (for edits that don't touch updated_at)"""
+        self._json_fragment = None
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            # Projection - only build the requested keys
+            return {f: getattr(self, f) for f in fields}
         return {
             'id': self.id,
             'name': self.name,
@@ -44,20 +69,23 @@ class Artisan:
         }
     
     @classmethod
+    @timed('from_dict')
     def from_dict(cls, data):
-        artisan = cls(
-            name=data['name'],
-            email=data['email'],
-            phone=data['phone'],
-            craft_type=data['craft_type'],
-            location=data['location'],
-            bio=data.get('bio'),
-            experience_years=data.get('experience_years', 0)
-        )
+        # Fill the slots directly: going through __init__ would mint a uuid
+        # and timestamps only to overwrite them straight away
+        artisan = cls.__new__(cls)
         artisan.id = data['id']
+        artisan.name = data['name']
+        artisan.email = data['email']
+        artisan.phone = data['phone']
+        artisan.craft_type = data['craft_type']
+        artisan.location = data['location']
+        artisan.bio = data.get('bio')
+        experience_years = data.get('experience_years', 0)
+        artisan.experience_years = int(experience_years) if experience_years else 0
         artisan.profile_image = data.get('profile_image')
         artisan.created_at = data['created_at']
-        artisan.updated_at = data.get('updated_at', get_timestamp())
+        artisan.updated_at = data.get('updated_at') or get_timestamp()
         artisan.status = data.get('status', 'active')
         artisan.verified = data.get('verified', False)
         artisan.rating = data.get('rating', 0.0)
@@ -69,6 +97,16 @@ class Artisan:
         self.rating = round(float(new_rating), 1)
         self.updated_at = get_timestamp()
     
+    def apply_changes(self, changes):
+        """Set the EDITABLE fields in changes; returns the fields that were written"""
+        for field in changes:
+            if field not in self.EDITABLE:
+                raise ValueError(f"'{field}' can't be changed")
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.updated_at = get_timestamp()
+        return set(changes) | {'updated_at'}
+    
     def increment_products(self):
         self.total_products += 1
         self.updated_at = get_timestamp()
@@ -1,6 +1,20 @@
-from utils.helpers import generate_id, get_timestamp
+from utils.helpers import generate_id, get_timestamp, encode_json
+from utils.metrics import timed
+from utils.image_variants import image_set
 
 class Product:
+    # Everything we store, in order
+    FIELDS = ('id', 'artisan_id', 'name', 'description', 'price', 'category', 'subcategory',
+              'materials', 'dimensions', 'weight', 'stock_quantity', 'images', 'created_at',
+              'updated_at', 'status', 'tags', 'featured')
+    # What to_dict() returns: the stored fields plus ones worked out from them
+    OUTPUT_FIELDS = FIELDS + ('image_sets',)
+    # What a PUT may change
+    EDITABLE = ('name', 'description', 'price', 'category', 'subcategory', 'materials', 'dimensions',
+                'weight', 'stock_quantity', 'status', 'featured', 'tags')
+    # No per-instance __dict__ - the catalog keeps every product resident
+    __slots__ = FIELDS + ('_json_fragment',)
+
     def __init__(self, artisan_id, name, description, price, category, 
                  subcategory=None, materials=None, dimensions=None, 
                  weight=None, stock_quantity=1, images=None):
@@ -20,13 +34,33 @@ class Product:
         self.stock_quantity = int(stock_quantity)  
         # Media and metadata
         self.images = images or []  
-        self.created_at = get_timestamp()
-        self.updated_at = get_timestamp()
+        now = get_timestamp()
+        self.created_at = now
+        self.updated_at = now
         self.status = "active" 
         self.tags = []
         self.featured = False
         
-    def to_dict(self):
+    def to_json(self):
+        """to_dict() as encoded JSON bytes, cached until updated_at changes"""
+        cached = getattr(self, '_json_fragment', None)
+        if cached is None or cached[0] != self.updated_at:
+            cached = self._json_fragment = (self.updated_at, encode_json(self.to_dict()))
+        return cached[1]
+
+    def invalidate_json(self):
+        """Drop the cached fragment (for edits that don't touch updated_at)"""
+        self._json_fragment = None
+
+    @property
+    def image_sets(self):
+        """Responsive variants (srcset per format) for each image"""
+        return [image_set(url) for url in self.images]
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            # Projection - only build the requested keys
+            return {f: getattr(self, f) for f in fields}
         return {
             'id': self.id,
             'artisan_id': self.artisan_id,
@@ -40,6 +74,7 @@ class Product:
             'weight': self.weight,
             'stock_quantity': self.stock_quantity,
             'images': self.images,
+            'image_sets': self.image_sets,
             'created_at': self.created_at,
             'updated_at': self.updated_at,
             'status': self.status,
@@ -48,28 +83,28 @@ class Product:
         }
     
     @classmethod
+    @timed('from_dict')
     def from_dict(cls, data):
-        product = cls(
-            artisan_id=data['artisan_id'],
-            name=data['name'],
-            description=data['description'],
-            price=data['price'],
-            category=data['category'],
-            subcategory=data.get('subcategory'),
-            materials=data.get('materials', []),
-            dimensions=data.get('dimensions'),
-            weight=data.get('weight'),
-            stock_quantity=data.get('stock_quantity', 1),
-            images=data.get('images', [])
-        )
-        
+        # Fill the slots directly: going through __init__ would mint a uuid
+        # and timestamps only to overwrite them straight away
+        product = cls.__new__(cls)
         product.id = data['id']
+        product.artisan_id = data['artisan_id']
+        product.name = data['name']
+        product.description = data['description']
+        product.price = float(data['price'])
+        product.category = data['category']
+        product.subcategory = data.get('subcategory')
+        product.materials = data.get('materials') or []
+        product.dimensions = data.get('dimensions')
+        product.weight = data.get('weight')
+        product.stock_quantity = int(data.get('stock_quantity', 1))
+        product.images = data.get('images') or []
         product.created_at = data['created_at']
-        product.updated_at = data.get('updated_at', get_timestamp())
+        product.updated_at = data.get('updated_at') or get_timestamp()
         product.status = data.get('status', 'active')
         product.tags = data.get('tags', [])
         product.featured = data.get('featured', False)
-        
         return product
     
     def update_stock(self, quantity):
@@ -83,6 +118,22 @@ class Product:
             
         self.updated_at = get_timestamp()
         
+    def apply_changes(self, changes):
+        """Set the EDITABLE fields in changes; returns the fields that were written"""
+        for field in changes:
+            if field not in self.EDITABLE:
+                raise ValueError(f"'{field}' can't be changed")
+        written = set(changes) | {'updated_at'}
+        # Stock first: it may flip the status, and an explicit status wins
+        if 'stock_quantity' in changes:
+            self.update_stock(changes['stock_quantity'])
+            written.add('status')
+        for field, value in changes.items():
+            if field != 'stock_quantity':
+                setattr(self, field, value)
+        self.updated_at = get_timestamp()
+        return written
+        
     def add_image(self, image_url):
         """Add an image URL if it's not already in the list"""
         if image_url and image_url not in self.images:
@@ -0,0 +1,226 @@
+import os
+import time
+import shutil
+import threading
+from config import Config
+
+
+def content_type_for(name):
+    return 'image/webp' if name.endswith('.webp') else 'image/jpeg'
+
+
+class BlobStorage:
+    """Where processed images end up, by key ('images/ab/<hash>/800.jpg').
+
+    Backends implement put_file/url/exists/delete_prefix/list; bulk puts
+    are built on those.
+    """
+    name = 'blob'
+    label = 'Blob Storage'
+
+    def put_file(self, local_path, key, content_type=None):
+        """Store a local file under key (the local copy is consumed) and return its URL"""
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        """Remove every blob under prefix/"""
+        raise NotImplementedError
+
+    def list(self, prefix):
+        """(key, modified timestamp) for every blob under prefix/"""
+        raise NotImplementedError
+
+    def put_files(self, items):
+        """Store several (local_path, key, content_type) items; returns {key: url}"""
+        return {key: self.put_file(path, key, content_type) for path, key, content_type in items}
+
+    def after_fork(self):
+        """Drop anything a forked worker can't share with its parent"""
+
+
+class LocalBlobStorage(BlobStorage):
+    """Files under root, served by the app's /uploads route"""
+    name = 'local'
+    label = 'Local Storage'
+
+    def __init__(self, root="uploads", url_prefix=None):
+        self.root = root
+        self.url_prefix = url_prefix or root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, local_path, key, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A rename on the same disk - no copy, and readers never see half a file
+        try:
+            os.replace(local_path, path)
+        except OSError:
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            shutil.copyfile(local_path, tmp_path)
+            os.replace(tmp_path, path)
+            os.remove(local_path)
+        return self.url(key)
+
+    def url(self, key):
+        return f"{self.url_prefix}/{key}"
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def delete_prefix(self, prefix):
+        path = self.path(prefix)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    def list(self, prefix):
+        base = self.path(prefix)
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                yield rel, os.path.getmtime(full)
+
+
+class GCSBlobStorage(BlobStorage):
+    """A Cloud Storage bucket; uploads go through GCSUploader's shared pool.
+
+    The SDK isn't imported and no client is built until the first call
+    that needs the bucket, so processes that never store an image don't
+    pay for it.
+    """
+    name = 'gcs'
+    label = 'Google Cloud Storage'
+
+    def __init__(self, bucket=None, bucket_name=None, max_workers=None):
+        self.bucket_name = bucket_name or Config.GOOGLE_CLOUD_BUCKET
+        self.max_workers = max_workers or Config.GCS_UPLOAD_WORKERS
+        self._given_bucket = bucket
+        self._bucket = bucket
+        self._uploader = None
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        # The client's HTTP connections belong to the parent - connect again when needed
+        self._bucket = self._given_bucket
+        self._uploader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            if self._uploader is None:
+                from services.gcs_uploader import GCSUploader
+                if self._bucket is None:
+                    from google.cloud import storage
+                    self._bucket = storage.Client().bucket(self.bucket_name)
+                    print("🌩️ Connected to Google Cloud Storage!")
+                self._uploader = GCSUploader(self._bucket, self.max_workers)
+            return self._uploader
+
+    @property
+    def bucket(self):
+        return self._connect().bucket
+
+    @property
+    def uploader(self):
+        return self._connect()
+
+    def put_file(self, local_path, key, content_type=None):
+        url = self.uploader.upload_file(local_path, key, content_type or content_type_for(key))
+        os.remove(local_path)
+        return url
+
+    def put_files(self, items):
+        # All at once, from the uploader's thread pool
+        urls = self.uploader.upload_many(items)
+        for path, _, _ in items:
+            os.remove(path)
+        return urls
+
+    def url(self, key):
+        return self.bucket.blob(key).public_url
+
+    def exists(self, key):
+        return self.bucket.blob(key).exists()
+
+    def delete_prefix(self, prefix):
+        for blob in self.bucket.list_blobs(prefix=f"{prefix}/"):
+            blob.delete()
+
+    def list(self, prefix):
+        for blob in self.bucket.list_blobs(prefix=f"{prefix}/"):
+            updated = blob.updated.timestamp() if blob.updated else time.time()
+            yield blob.name, updated
+
+
+class MemoryBlobStorage(BlobStorage):
+    """Blobs in a dict - for benchmarks and tests, nothing touches disk or network"""
+    name = 'memory'
+    label = 'Memory'
+
+    def __init__(self):
+        self.blobs = {}
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def put_file(self, local_path, key, content_type=None):
+        with open(local_path, 'rb') as f:
+            data = f.read()
+        os.remove(local_path)
+        self._store(key, data, content_type)
+        return self.url(key)
+
+    def _store(self, key, data, content_type):
+        with self._lock:
+            self.blobs[key] = (data, content_type or content_type_for(key), time.time())
+
+    def url(self, key):
+        return f"memory://{key}"
+
+    def exists(self, key):
+        return key in self.blobs
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self.blobs if k.startswith(f"{prefix}/")]:
+                del self.blobs[key]
+
+    def list(self, prefix):
+        with self._lock:
+            items = [(k, v[2]) for k, v in self.blobs.items() if k.startswith(f"{prefix}/")]
+        return iter(items)
+
+
+BLOB_STORAGES = {
+    'local': LocalBlobStorage,
+    'gcs': GCSBlobStorage,
+    'memory': MemoryBlobStorage,
+}
+
+
+def create_blob_storage(kind=None, config=None, **options):
+    """The configured backend (a bucket is only connected to when first used).
+
+    Settings not given in options come from config (Config by default).
+    """
+    config = config or Config
+    kind = kind or config.BLOB_STORAGE
+    if kind not in BLOB_STORAGES:
+        raise ValueError(f"Unknown blob storage '{kind}'. Options: {', '.join(BLOB_STORAGES)}")
+    if kind == 'gcs':
+        options.setdefault('bucket_name', config.GOOGLE_CLOUD_BUCKET)
+        options.setdefault('max_workers', config.GCS_UPLOAD_WORKERS)
+    elif kind == 'local':
+        # Still served from /uploads/, wherever the folder is
+        options.setdefault('root', config.UPLOAD_FOLDER)
+        options.setdefault('url_prefix', 'uploads')
+    return BLOB_STORAGES[kind](**options)
@@ -0,0 +1,196 @@
+from collections import defaultdict, Counter
+from typing import Dict, List, Optional
+from services.search_index import SearchIndex
+
+
+def ids_from_bits(bits, slot_ids):
+    """Turn a bitset (int) back into ids, in slot order"""
+    # bin() is one C-level pass, much cheaper than peeling bits off a big int
+    flags = bin(bits)[:1:-1]
+    result = []
+    pos = flags.find('1')
+    while pos != -1:
+        result.append(slot_ids[pos])
+        pos = flags.find('1', pos + 1)
+    return result
+
+
+class ArtisanIndexes:
+    """Secondary lookups and dashboard counters for artisans (the id index is the table itself)"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.by_email: Dict[str, str] = {}
+        # id -> (email, craft_type, verified) as last indexed
+        self._keys: Dict[str, tuple] = {}
+        self.craft_counts = Counter()
+        self.verified_count = 0
+        self._craft_types_sorted = None
+
+    def rebuild(self, records):
+        self.clear()
+        for artisan in records.values():
+            self.add(artisan)
+
+    def add(self, artisan):
+        """Index a new artisan or re-index an updated one"""
+        old = self._keys.get(artisan.id)
+        if old is not None:
+            old_email, old_craft, old_verified = old
+            if self.by_email.get(old_email) == artisan.id:
+                del self.by_email[old_email]
+            self._count_craft(old_craft, -1)
+            self.verified_count -= old_verified
+
+        keys = ((artisan.email or '').lower(), artisan.craft_type, bool(artisan.verified))
+        email, craft_type, verified = keys
+        self.by_email[email] = artisan.id
+        self._count_craft(craft_type, 1)
+        self.verified_count += verified
+        self._keys[artisan.id] = keys
+
+    def _count_craft(self, craft_type, delta):
+        self.craft_counts[craft_type] += delta
+        if self.craft_counts[craft_type] <= 0:
+            del self.craft_counts[craft_type]
+            self._craft_types_sorted = None
+        elif delta > 0 and self.craft_counts[craft_type] == delta:
+            self._craft_types_sorted = None
+
+    def craft_types(self):
+        """Distinct craft types, sorted (cached until the set changes)"""
+        if self._craft_types_sorted is None:
+            self._craft_types_sorted = sorted(self.craft_counts)
+        return list(self._craft_types_sorted)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class ProductIndexes:
+    """Secondary lookups for products.
+
+    artisan/category map to ordered id sets; status and featured are
+    bitsets over per-product slots so whole-catalog filters are a few
+    big-int ANDs instead of a scan. Category and status counts are kept
+    alongside for the dashboard.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[str] = []
+        # id -> (artisan_id, category_lower, status, featured, category) as last indexed
+        self._keys: Dict[str, tuple] = {}
+        self.by_artisan = defaultdict(dict)
+        self.by_category = defaultdict(dict)
+        self.status_bits = defaultdict(int)
+        self.featured_bits = 0
+        self.search = SearchIndex()
+        self.category_counts = Counter()
+        self.status_counts = Counter()
+        self._categories_sorted = None
+
+    def rebuild(self, records):
+        self.clear()
+        for product in records.values():
+            self.add(product)
+
+    def add(self, product):
+        """Index a new product or re-index an updated one"""
+        slot = self._slots.get(product.id)
+        if slot is None:
+            slot = self._slots[product.id] = len(self._slot_ids)
+            self._slot_ids.append(product.id)
+        else:
+            self._remove_keys(product.id, slot)
+
+        bit = 1 << slot
+        keys = (product.artisan_id, (product.category or '').lower(),
+                product.status, bool(product.featured), product.category)
+        artisan_id, category, status, featured, display_category = keys
+
+        self.by_artisan[artisan_id][product.id] = None
+        self.by_category[category][product.id] = None
+        self.status_bits[status] |= bit
+        if featured:
+            self.featured_bits |= bit
+        self._count_category(display_category, 1)
+        self.status_counts[status] += 1
+        self._keys[product.id] = keys
+        self.search.add(product.id, product)
+
+    def _remove_keys(self, product_id, slot):
+        artisan_id, category, status, featured, display_category = self._keys[product_id]
+        bit = 1 << slot
+
+        self.by_artisan[artisan_id].pop(product_id, None)
+        if not self.by_artisan[artisan_id]:
+            del self.by_artisan[artisan_id]
+        self.by_category[category].pop(product_id, None)
+        if not self.by_category[category]:
+            del self.by_category[category]
+        self.status_bits[status] &= ~bit
+        if featured:
+            self.featured_bits &= ~bit
+        self._count_category(display_category, -1)
+        self.status_counts[status] -= 1
+
+    def _count_category(self, category, delta):
+        self.category_counts[category] += delta
+        if self.category_counts[category] <= 0:
+            del self.category_counts[category]
+            self._categories_sorted = None
+        elif delta > 0 and self.category_counts[category] == delta:
+            self._categories_sorted = None
+
+    def categories(self):
+        """Distinct categories, sorted (cached until the set changes)"""
+        if self._categories_sorted is None:
+            self._categories_sorted = sorted(self.category_counts)
+        return list(self._categories_sorted)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def select(self, category: Optional[str] = None, artisan_id: Optional[str] = None,
+               status: Optional[str] = None, featured: bool = False) -> List[str]:
+        """Ids matching every given filter, in catalog order"""
+        if category is not None or artisan_id is not None:
+            if category is not None:
+                candidates = self.by_category.get(category.lower(), {})
+            else:
+                candidates = self.by_artisan.get(artisan_id, {})
+
+            result = []
+            for product_id in candidates:
+                p_artisan, _, p_status, p_featured, _ = self._keys[product_id]
+                if artisan_id is not None and p_artisan != artisan_id:
+                    continue
+                if status is not None and p_status != status:
+                    continue
+                if featured and not p_featured:
+                    continue
+                result.append(product_id)
+            return result
+
+        if status is None and not featured:
+            return list(self._slot_ids)
+
+        bits = (1 << len(self._slot_ids)) - 1
+        if status is not None:
+            bits &= self.status_bits.get(status, 0)
+        if featured:
+            bits &= self.featured_bits
+        return ids_from_bits(bits, self._slot_ids)
+
+    def matches(self, product_id, status: Optional[str] = None, featured: bool = False):
+        """Check one product against the status/featured filters"""
+        _, _, p_status, p_featured, _ = self._keys[product_id]
+        if status is not None and p_status != status:
+            return False
+        return p_featured or not featured
@@ -0,0 +1,152 @@
+import os
+import hashlib
+import threading
+from collections import ChainMap
+from contextlib import contextmanager
+from typing import Dict
+from models.artisan import Artisan
+from models.product import Product
+from services.catalog_indexes import ArtisanIndexes, ProductIndexes
+from services.storage_engines import create_storage
+from utils.locks import ReadWriteLock, FileLock
+
+
+class ResidentTable:
+    """One table kept in memory as model objects, keyed by id"""
+
+    def __init__(self, storage, model_cls, indexes):
+        self.storage = storage
+        self.model_cls = model_cls
+        self.indexes = indexes
+        self.records: Dict[str, object] = {}
+
+    def refresh(self):
+        """Pull in anything written to storage since we last looked"""
+        change = self.storage.poll()
+        if change is None:
+            return False
+
+        full_reload, items = change
+        if full_reload:
+            self.records = {item['id']: self.model_cls.from_dict(item) for item in items}
+            self.indexes.rebuild(self.records)
+        else:
+            for item in items:
+                self.put(self.model_cls.from_dict(item))
+        return True
+
+    def put(self, record):
+        """Insert or replace a record and keep the indexes in step"""
+        # The API edits fields without bumping updated_at, so never trust an old fragment here
+        record.invalidate_json()
+        self.records[record.id] = record
+        self.indexes.add(record)
+
+    def save(self, record):
+        """Persist a record, then put() it - if the write fails, memory is left as it was"""
+        return self._saved(self.storage.write(self._with([record]), record), [record])
+
+    def save_many(self, records):
+        """save() several records in one storage write"""
+        return self._saved(self.storage.write_many(self._with(records), records), records)
+
+    def _with(self, records):
+        # The table as it will be with these in (the json engine writes all of it),
+        # without touching the one readers see
+        return ChainMap({record.id: record for record in records}, self.records)
+
+    def _saved(self, saved, records):
+        if not saved:
+            raise OSError(f"Could not save to {self.storage.filepath}")
+        for record in records:
+            self.put(record)
+        return saved
+
+
+class CatalogStore:
+    """Process-wide in-memory copy of the artisan and product tables.
+
+    Storage is only re-read when it changes on disk, so reads don't pay
+    for a full JSON parse on every call. Reads share a reader/writer lock;
+    writes take it exclusively plus a file lock in the data folder, so
+    writes from every worker process are serialized and each one starts
+    from the latest data on disk.
+    """
+
+    _instances: Dict[tuple, 'CatalogStore'] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_data_dir(cls, data_dir, engine='json'):
+        """Get the shared store for a data directory"""
+        key = (os.path.abspath(data_dir), engine)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(data_dir, engine)
+            return store
+
+    def __init__(self, data_dir, engine='json'):
+        self.data_dir = data_dir
+        self.engine = engine
+        self.artisans = ResidentTable(create_storage(engine, os.path.join(data_dir, "artisans.json")),
+                                      Artisan, ArtisanIndexes())
+        self.products = ResidentTable(create_storage(engine, os.path.join(data_dir, "products.json")),
+                                      Product, ProductIndexes())
+        self.rwlock = ReadWriteLock()
+        self.file_lock = FileLock(os.path.join(data_dir, ".catalog.lock"))
+
+    @property
+    def tables(self):
+        return (self.artisans, self.products)
+
+    def after_fork(self):
+        """Fresh thread locks in a forked worker (the file lock reopens itself)"""
+        self.rwlock = ReadWriteLock()
+        for table in self.tables:
+            if hasattr(table.storage, 'after_fork'):
+                table.storage.after_fork()
+
+    def refresh(self):
+        """Reload any table that was changed by someone else"""
+        if not any(table.storage.has_changes() for table in self.tables):
+            return
+        with self.rwlock.write():
+            for table in self.tables:
+                table.refresh()
+
+    @contextmanager
+    def reading(self):
+        """Up-to-date, consistent view of the tables; many threads at once"""
+        self.refresh()
+        with self.rwlock.read():
+            yield self
+
+    @contextmanager
+    def writing(self):
+        """Exclusive access across threads and worker processes"""
+        with self.rwlock.write():
+            with self.file_lock:
+                # Other workers may have written while we waited for the lock
+                for table in self.tables:
+                    table.refresh()
+                yield self
+
+    def version(self):
+        """(token, last_modified) for the data on disk.
+
+        Every create/update rewrites or appends to a storage file, which
+        changes its signature, so the token moves on with each write from
+        any worker. Used to validate cached HTTP responses.
+        """
+        signatures = [sig for table in self.tables for sig in table.storage.version()]
+        token = hashlib.sha1(repr(signatures).encode('utf-8')).hexdigest()[:20]
+        last_modified = max((sig[0] for sig in signatures if sig), default=0) / 1e9
+        return token, last_modified
+
+    def compact(self):
+        """Fold any pending log entries into the snapshots (no-op for plain JSON)"""
+        with self.writing():
+            for table in self.tables:
+                if hasattr(table.storage, 'compact'):
+                    table.storage.compact(table.records)
@@ -1,131 +1,318 @@
 import os
-import json
-from typing import List, Optional, Dict, Any
+import copy
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 from models.artisan import Artisan
 from models.product import Product
-from utils.helpers import save_json_data, load_json_data
+from services.catalog_store import CatalogStore
+from utils.helpers import save_json_data, get_timestamp
+from utils.pagination import parse_sort, page_by_key, page_by_offset, cursor_offset
+from config import Config
+
+PRODUCT_SORT_FIELDS = {'price', 'created_at', 'updated_at', 'name', 'stock_quantity'}
+ARTISAN_SORT_FIELDS = {'rating', 'total_products', 'created_at', 'experience_years', 'name'}
+
+
+def _page(records, sort_field, descending, limit, cursor):
+    # No paging or sorting asked for - keep catalog order like before
+    if sort_field is None and limit is None and not cursor:
+        return records, None
+    return page_by_key(records, sort_field, descending, limit, cursor)
+
 
 class DataService:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", storage_engine=None):
         self.data_dir = data_dir
+        self.storage_engine = storage_engine or Config.STORAGE_ENGINE
         self.artisans_file = os.path.join(data_dir, "artisans.json")
         self.products_file = os.path.join(data_dir, "products.json")
-        
+
         os.makedirs(data_dir, exist_ok=True)
-        
+
         if not os.path.exists(self.artisans_file):
             save_json_data([], self.artisans_file)
-        
+
         if not os.path.exists(self.products_file):
             save_json_data([], self.products_file)
-    
+
+        # Shared by every DataService pointing at the same folder
+        self.store = CatalogStore.for_data_dir(data_dir, self.storage_engine)
+
+    def data_version(self) -> Tuple[str, float]:
+        """(token, last_modified) that changes whenever any worker writes"""
+        return self.store.version()
+
+    def preload(self) -> int:
+        """Load the tables and indexes and encode every record's JSON now; returns the record count"""
+        with self.store.reading():
+            records = [record for table in self.store.tables for record in table.records.values()]
+        for record in records:
+            record.to_json()
+        return len(records)
+
+    def after_fork(self):
+        self.store.after_fork()
+
+    def _detach(self, record):
+        """Copy a resident record so callers can edit it before saving"""
+        return copy.deepcopy(record) if record is not None else None
+
     # Artisan methods
     def get_all_artisans(self) -> List[Artisan]:
-        data = load_json_data(self.artisans_file)
-        return [Artisan.from_dict(item) for item in data]
-    
+        # Resident objects - treat them as read-only
+        with self.store.reading():
+            return list(self.store.artisans.records.values())
+
     def get_artisan_by_id(self, artisan_id: str) -> Optional[Artisan]:
-        for artisan in self.get_all_artisans():
-            if artisan.id == artisan_id:
-                return artisan
-        return None
-    
+        with self.store.reading():
+            return self._detach(self.store.artisans.records.get(artisan_id))
+
     def get_artisan_by_email(self, email: str) -> Optional[Artisan]:
-        for artisan in self.get_all_artisans():
-            if artisan.email == email:
-                return artisan
-        return None
-    
+        with self.store.reading():
+            artisan_id = self.store.artisans.indexes.by_email.get((email or '').lower())
+            return self._detach(self.store.artisans.records.get(artisan_id))
+
+    def artisan_exists(self, artisan_id: str) -> bool:
+        """Cheap existence check that skips copying the record"""
+        with self.store.reading():
+            return artisan_id in self.store.artisans.records
+
+    def list_artisans(self, craft_type: Optional[str] = None, verified: bool = False,
+                      sort: Optional[str] = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of artisans plus the cursor for the next one"""
+        sort_field, descending = parse_sort(sort, ARTISAN_SORT_FIELDS)
+
+        artisans = self.get_all_artisans()
+        if craft_type:
+            artisans = [a for a in artisans if a.craft_type.lower() == craft_type.lower()]
+        if verified:
+            artisans = [a for a in artisans if a.verified]
+
+        page, next_cursor = _page(artisans, sort_field, descending, limit, cursor)
+        return {'items': page, 'next_cursor': next_cursor, 'total': len(artisans)}
+
     def create_artisan(self, artisan: Artisan) -> Artisan:
-        artisans = load_json_data(self.artisans_file)
-        artisans.append(artisan.to_dict())
-        save_json_data(artisans, self.artisans_file)
+        with self.store.writing():
+            self.store.artisans.save(artisan)
         return artisan
-    
+
+    def update_artisan_fields(self, artisan_id: str, changes: Dict[str, Any]) -> Optional[Artisan]:
+        """Apply changes (Artisan.EDITABLE fields) to the current record, leaving the rest alone"""
+        with self.store.writing():
+            current = self.store.artisans.records.get(artisan_id)
+            if current is None:
+                return None
+
+            # The latest record, so a counter bumped since the client read it isn't undone
+            artisan = self._detach(current)
+            artisan.apply_changes(changes)
+            self.store.artisans.save(artisan)
+            return artisan
+
     def update_artisan(self, artisan: Artisan) -> Optional[Artisan]:
-        artisans = load_json_data(self.artisans_file)
-        
-        for i, item in enumerate(artisans):
-            if item['id'] == artisan.id:
-                artisans[i] = artisan.to_dict()
-                save_json_data(artisans, self.artisans_file)
-                return artisan
-        
-        return None  
-    
+        with self.store.writing():
+            if artisan.id not in self.store.artisans.records:
+                return None
+
+            self.store.artisans.save(artisan)
+            return artisan
+
     # Product methods
     def get_all_products(self) -> List[Product]:
-        data = load_json_data(self.products_file)
-        return [Product.from_dict(item) for item in data]
-    
+        # Resident objects - treat them as read-only
+        with self.store.reading():
+            return list(self.store.products.records.values())
+
     def get_product_by_id(self, product_id: str) -> Optional[Product]:
-        for product in self.get_all_products():
-            if product.id == product_id:
-                return product
-        return None
-    
+        with self.store.reading():
+            return self._detach(self.store.products.records.get(product_id))
+
     def get_products_by_artisan(self, artisan_id: str) -> List[Product]:
-        return [p for p in self.get_all_products() if p.artisan_id == artisan_id]
-    
+        return self.query_products(artisan_id=artisan_id)
+
     def get_products_by_category(self, category: str) -> List[Product]:
-        return [p for p in self.get_all_products() if p.category.lower() == category.lower()]
-    
+        return self.query_products(category=category)
+
+    def query_products(self, category: Optional[str] = None, artisan_id: Optional[str] = None,
+                       status: Optional[str] = None, featured: bool = False) -> List[Product]:
+        """Filter products through the indexes instead of scanning the catalog"""
+        with self.store.reading():
+            records = self.store.products.records
+            ids = self.store.products.indexes.select(category=category, artisan_id=artisan_id,
+                                                     status=status, featured=featured)
+            return [records[i] for i in ids]
+
+    def list_products(self, category: Optional[str] = None, artisan_id: Optional[str] = None,
+                      status: Optional[str] = None, featured: bool = False,
+                      search: Optional[str] = None, sort: Optional[str] = None,
+                      limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of products plus the cursor for the next one.
+
+        Search results keep their relevance order (and scores) unless an
+        explicit sort is asked for. A ranked page only ranks as far as it
+        needs to, so when that stopped short of counting every match the
+        total is an estimate and total_is_estimate says so.
+        """
+        sort_field, descending = parse_sort(sort, PRODUCT_SORT_FIELDS)
+        scores = None
+
+        if search:
+            depth = None
+            if sort_field is None and limit is not None:
+                # Everything up to this page, plus one to know if there's another
+                depth = cursor_offset(cursor) + limit + 1
+            ranked, total, estimated = self._rank_products(search, depth, status, featured)
+            products = [p for p, _ in ranked]
+            scores = {p.id: score for p, score in ranked}
+            if sort_field is None:
+                page, next_cursor = page_by_offset(products, limit, cursor)
+                return {'items': page, 'scores': scores, 'next_cursor': next_cursor, 'total': total,
+                        'total_is_estimate': estimated}
+        else:
+            products = self.query_products(category=category, artisan_id=artisan_id,
+                                           status=status, featured=featured)
+
+        page, next_cursor = _page(products, sort_field, descending, limit, cursor)
+        return {'items': page, 'scores': scores, 'next_cursor': next_cursor, 'total': len(products)}
+
+    def iter_products(self, status: Optional[str] = None) -> Iterator[Product]:
+        """Walk the catalog without building a result list (for exports)"""
+        with self.store.reading():
+            ids = self.store.products.indexes.select(status=status)
+        for product_id in ids:
+            product = self.store.products.records.get(product_id)
+            if product is not None:
+                yield product
+
+    def iter_artisans(self) -> Iterator[Artisan]:
+        for artisan in self.get_all_artisans():
+            yield artisan
+
     def search_products(self, query: str) -> List[Product]:
-        query = query.lower()
-        results = []
-        
-        for product in self.get_all_products():
-            # Check name, description, materials
-            if (query in product.name.lower() or 
-                query in product.description.lower() or
-                any(query in m.lower() for m in product.materials)):
-                results.append(product)
-        
-        return results
-    
+        return [product for product, _ in self.search_products_ranked(query)]
+
+    def search_products_ranked(self, query: str, limit: Optional[int] = None, status: Optional[str] = None,
+                               featured: bool = False) -> List[Tuple[Product, float]]:
+        """Best matches first, each with its relevance score"""
+        return self._rank_products(query, limit, status, featured)[0]
+
+    def _rank_products(self, query, limit, status, featured):
+        with self.store.reading():
+            records = self.store.products.records
+            indexes = self.store.products.indexes
+            accept = None
+            if status is not None or featured:
+                # Filter inside the index so a top-k search still fills its page
+                accept = lambda product_id: indexes.matches(product_id, status=status, featured=featured)
+            hits, total, estimated = indexes.search.rank(query, limit, accept)
+            return [(records[product_id], score) for product_id, score in hits], total, estimated
+
     def create_product(self, product: Product) -> Product:
-        products = load_json_data(self.products_file)
-        products.append(product.to_dict())
-        save_json_data(products, self.products_file)
-        
-        # Update artisan's product count
-        artisan = self.get_artisan_by_id(product.artisan_id)
-        if artisan:
-            artisan.increment_products()
-            self.update_artisan(artisan)
-        
+        with self.store.writing():
+            self.store.products.save(product)
+
+            # Update artisan's product count - under the same lock, so no increment is lost.
+            # On a copy like every other write, so readers never see it half done.
+            artisan = self._detach(self.store.artisans.records.get(product.artisan_id))
+            if artisan:
+                artisan.increment_products()
+                self.store.artisans.save(artisan)
+
         return product
-    
+
+    def update_product_fields(self, product_id: str, changes: Dict[str, Any]) -> Optional[Product]:
+        """Apply changes (Product.EDITABLE fields) to the current record, leaving the rest alone"""
+        with self.store.writing():
+            current = self.store.products.records.get(product_id)
+            if current is None:
+                return None
+
+            product = self._detach(current)
+            product.apply_changes(changes)
+            self.store.products.save(product)
+            return product
+
     def update_product(self, product: Product) -> Optional[Product]:
-        products = load_json_data(self.products_file)
-        
-        for i, item in enumerate(products):
-            if item['id'] == product.id:
-                products[i] = product.to_dict()
-                save_json_data(products, self.products_file)
-                return product
-        
-        return None  
-    
+        with self.store.writing():
+            if product.id not in self.store.products.records:
+                return None
+
+            self.store.products.save(product)
+            return product
+
+    def add_product_images(self, product_id: str, urls: List[str]) -> Optional[Product]:
+        """Append image URLs to the current copy of a product in a single write"""
+        with self.store.writing():
+            current = self.store.products.records.get(product_id)
+            if current is None:
+                return None
+
+            # Work on the latest record, not a copy a request read earlier
+            product = self._detach(current)
+            added = [url for url in urls if product.add_image(url)]
+            if added:
+                self.store.products.save(product)
+            return product
+
+    def update_product_descriptions(self, descriptions: Dict[str, str]) -> int:
+        """Set many products' descriptions in one write; returns how many were updated"""
+        with self.store.writing():
+            changed = []
+            now = get_timestamp()
+            for product_id, description in descriptions.items():
+                current = self.store.products.records.get(product_id)
+                if current is None:
+                    continue
+                product = self._detach(current)
+                product.description = description
+                product.updated_at = now
+                changed.append(product)
+            if changed:
+                self.store.products.save_many(changed)
+            return len(changed)
+
+    def set_profile_image(self, artisan_id: str, url: str) -> Optional[Artisan]:
+        with self.store.writing():
+            current = self.store.artisans.records.get(artisan_id)
+            if current is None:
+                return None
+
+            artisan = self._detach(current)
+            artisan.profile_image = url
+            artisan.updated_at = get_timestamp()
+            self.store.artisans.save(artisan)
+            return artisan
+
     def get_categories(self) -> List[str]:
-        products = self.get_all_products()
-        categories = set(p.category for p in products)
-        return sorted(list(categories))
-    
+        with self.store.reading():
+            return self.store.products.indexes.categories()
+
     def get_craft_types(self) -> List[str]:
-        artisans = self.get_all_artisans()
-        craft_types = set(a.craft_type for a in artisans)
-        return sorted(list(craft_types))
-    
+        with self.store.reading():
+            return self.store.artisans.indexes.craft_types()
+
     def get_dashboard_stats(self) -> Dict[str, Any]:
-        artisans = self.get_all_artisans()
-        products = self.get_all_products()
-        
-        return {
-            'total_artisans': len(artisans),
-            'total_products': len(products),
-            'verified_artisans': sum(1 for a in artisans if a.verified),
-            'active_products': sum(1 for p in products if p.status == 'active'),
-            'categories': self.get_categories(),
-            'craft_types': self.get_craft_types()
-        }
\ No newline at end of file
+        # Every number here is a counter kept up to date on create/update
+        with self.store.reading():
+            artisans = self.store.artisans.indexes
+            products = self.store.products.indexes
+
+            return {
+                'total_artisans': len(artisans),
+                'total_products': len(products),
+                'verified_artisans': artisans.verified_count,
+                'active_products': products.status_counts['active'],
+                'categories': products.categories(),
+                'craft_types': artisans.craft_types()
+            }
+
+def create_data_service(data_dir=None, storage_engine=None, sqlite_path=None):
+    """Build the data service selected by Config.STORAGE_ENGINE (or the arguments)"""
+    data_dir = data_dir or Config.DATA_DIR
+    storage_engine = storage_engine or Config.STORAGE_ENGINE
+
+    if storage_engine == 'sqlite':
+        from services.sqlite_data_service import SQLiteDataService
+        return SQLiteDataService(sqlite_path or Config.SQLITE_PATH, data_dir)
+
+    return DataService(data_dir, storage_engine)
@@ -0,0 +1,217 @@
+"""Rewrite existing product descriptions with Gemini, in bulk.
+
+    python -m services.description_batch --rate 2 --concurrency 4
+    python -m services.description_batch --limit 20 --stub    # dry run, no API calls
+
+Products are streamed from the DataService, sent to the model from a
+small thread pool (never faster than --rate calls per second), and
+written back a chunk at a time in one write each. Progress goes to a
+checkpoint file after every chunk, so a stopped run picks up where it
+left off; --restart starts over. An item the model can't do gets the
+plain-text fallback description instead.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.helpers import get_timestamp, load_json_data, save_json_data
+from utils.locks import FileLock
+from config import Config
+
+
+class TokenBucket:
+    """At most rate acquisitions per second on average, with bursts of up to burst"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until there is one"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class EchoModel:
+    """Stand-in for the Gemini model (--stub): answers instantly, costs nothing"""
+
+    class _Response:
+        def __init__(self, text):
+            self.text = text
+
+    def generate_content(self, prompt):
+        description = prompt.split('* Description: ', 1)[-1].split('\n', 1)[0]
+        return self._Response(f"[stub] {description}")
+
+
+class DescriptionBatch:
+    """One resumable pass over the catalog; see the module docstring"""
+
+    def __init__(self, data, ai, checkpoint_path=None, rate=None, concurrency=None, chunk_size=None):
+        self.data = data
+        self.ai = ai
+        self.checkpoint_path = checkpoint_path or Config.DESCRIPTION_BATCH_CHECKPOINT
+        self.rate = rate or Config.DESCRIPTION_BATCH_RATE
+        self.concurrency = concurrency or Config.DESCRIPTION_BATCH_CONCURRENCY
+        self.chunk_size = chunk_size or self.concurrency * 8
+        # One run at a time, across every worker process
+        self.run_lock = FileLock(f"{self.checkpoint_path}.lock")
+        self._craft_types = {}
+
+    # Checkpoint
+    def _new_checkpoint(self):
+        return {
+            'status': 'idle',
+            'done_ids': [],
+            'processed': 0,
+            'enhanced': 0,
+            'fallbacks': 0,
+            'errors': [],
+            'started_at': None,
+            'updated_at': None
+        }
+
+    def load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            return load_json_data(self.checkpoint_path) or self._new_checkpoint()
+        return self._new_checkpoint()
+
+    def _save_checkpoint(self, checkpoint):
+        checkpoint['updated_at'] = get_timestamp()
+        save_json_data(checkpoint, self.checkpoint_path)
+
+    def running(self):
+        """Is a run going on in any process right now?"""
+        if not self.run_lock.acquire(blocking=False):
+            return True
+        self.run_lock.release()
+        return False
+
+    def status(self):
+        """Progress without the (long) list of finished ids"""
+        checkpoint = self.load_checkpoint()
+        checkpoint['done'] = len(checkpoint.pop('done_ids', []))
+        if checkpoint['status'] == 'running' and not self.running():
+            # The process doing it died; the next run resumes from here
+            checkpoint['status'] = 'interrupted'
+        return checkpoint
+
+    # Work
+    def _craft_type(self, artisan_id):
+        if artisan_id not in self._craft_types:
+            artisan = self.data.get_artisan_by_id(artisan_id)
+            self._craft_types[artisan_id] = artisan.craft_type if artisan else ''
+        return self._craft_types[artisan_id]
+
+    def _describe(self, inputs, bucket):
+        """(text, used_model) for one product; the fallback if the model fails"""
+        try:
+            if not self.ai.ai_available:
+                raise RuntimeError('Gemini AI is not available')
+            bucket.acquire()
+            # Straight to the model: every input is new, and we have our own threads
+            return self.ai.generate_description_uncached(*inputs), True
+        except Exception as e:
+            print(f"⚠️ Model failed for '{inputs[1]}': {e}")
+            return self.ai.fallback_description(*inputs), False
+
+    def _run_chunk(self, pool, bucket, chunk, checkpoint):
+        jobs = [(product_id, pool.submit(self._describe, inputs, bucket)) for product_id, inputs in chunk]
+        descriptions = {}
+        for product_id, future in jobs:
+            text, used_model = future.result()
+            descriptions[product_id] = text
+            checkpoint['enhanced' if used_model else 'fallbacks'] += 1
+
+        # Written back together, then recorded as done - a crash in between only redoes this chunk
+        self.data.update_product_descriptions(descriptions)
+        checkpoint['done_ids'].extend(descriptions)
+        checkpoint['processed'] += len(descriptions)
+        self._save_checkpoint(checkpoint)
+        print(f"📝 {checkpoint['processed']} descriptions done "
+              f"({checkpoint['fallbacks']} fallbacks)")
+
+    def run(self, limit=None, status=None, restart=False):
+        """Enhance every product not done yet (at most limit this time); returns the checkpoint"""
+        if not self.run_lock.acquire(blocking=False):
+            raise RuntimeError('A description batch is already running')
+        try:
+            checkpoint = self._new_checkpoint() if restart else self.load_checkpoint()
+            done = set(checkpoint['done_ids'])
+            checkpoint['status'] = 'running'
+            checkpoint['started_at'] = checkpoint['started_at'] or get_timestamp()
+            self._save_checkpoint(checkpoint)
+
+            bucket = TokenBucket(self.rate)
+            taken = 0
+            finished = True
+            try:
+                with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='describe') as pool:
+                    chunk = []
+                    for product in self.data.iter_products(status=status):
+                        if product.id in done:
+                            continue
+                        if limit is not None and taken >= limit:
+                            finished = False
+                            break
+                        taken += 1
+                        chunk.append((product.id, (product.description, product.name,
+                                                   self._craft_type(product.artisan_id), product.materials)))
+                        if len(chunk) >= self.chunk_size:
+                            self._run_chunk(pool, bucket, chunk, checkpoint)
+                            chunk = []
+                    if chunk:
+                        self._run_chunk(pool, bucket, chunk, checkpoint)
+                # 'stopped' - the limit ran out first, the next run carries on
+                checkpoint['status'] = 'done' if finished else 'stopped'
+            except Exception as e:
+                checkpoint['status'] = 'failed'
+                checkpoint['errors'].append(str(e))
+                raise
+            finally:
+                self._save_checkpoint(checkpoint)
+            return checkpoint
+        finally:
+            self.run_lock.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int, help='stop after this many products')
+    parser.add_argument('--status', help="only products with this status, e.g. 'active'")
+    parser.add_argument('--rate', type=float, default=Config.DESCRIPTION_BATCH_RATE, help='model calls per second')
+    parser.add_argument('--concurrency', type=int, default=Config.DESCRIPTION_BATCH_CONCURRENCY)
+    parser.add_argument('--checkpoint', default=Config.DESCRIPTION_BATCH_CHECKPOINT)
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start over')
+    parser.add_argument('--stub', action='store_true', help='use a fake model instead of Gemini')
+    args = parser.parse_args()
+
+    from services.data_service import create_data_service
+    from services.google_cloud_service import GoogleCloudService
+
+    ai = GoogleCloudService(gemini_model=EchoModel() if args.stub else None)
+    batch = DescriptionBatch(create_data_service(), ai, args.checkpoint, args.rate, args.concurrency)
+    start = time.perf_counter()
+    checkpoint = batch.run(limit=args.limit, status=args.status, restart=args.restart)
+    print(f"✅ {checkpoint['processed']} products done in total, {checkpoint['fallbacks']} with the fallback "
+          f"({time.perf_counter() - start:.1f}s this run)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def description_key(raw_description, product_name, craft_type, materials):
+    """Same inputs, same key - whitespace at either end doesn't count"""
+    parts = [str(raw_description or '').strip(), str(product_name or '').strip(),
+             str(craft_type or '').strip(), [str(m).strip() for m in materials or []]]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class DescriptionCache:
+    """Bounded LRU of generated descriptions, each kept for ttl seconds.
+
+    Model output doesn't depend on the catalog, so unlike ResponseCache
+    there's no data version - entries just age out.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = (text, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
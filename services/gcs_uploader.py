@@ -0,0 +1,103 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import timed
+
+# Objects bigger than this go up as a resumable upload in CHUNK_SIZE pieces,
+# so a dropped connection only costs one chunk (must be a multiple of 256KB)
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# HTTP statuses worth another try
+TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+ALREADY_EXISTS = 412
+
+
+def _status_code(error):
+    # google.api_core exceptions carry the HTTP status as .code
+    code = getattr(error, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(error):
+    return isinstance(error, (ConnectionError, TimeoutError)) or _status_code(error) in TRANSIENT_CODES
+
+
+class GCSUploader:
+    """Uploads to a bucket from one shared thread pool.
+
+    Works with anything shaped like google.cloud.storage.Bucket (bucket.blob(name)
+    with upload_from_filename and public_url), so an in-process fake can
+    stand in for it. Objects are never overwritten:
+    every upload is create-only (if_generation_match=0), and an object
+    that's already there counts as uploaded. That's what we want for
+    content-addressed images. Objects are not made public one by one;
+    the bucket is expected to grant public read itself (uniform
+    bucket-level access with allUsers as objectViewer).
+    """
+
+    def __init__(self, bucket, max_workers=8, max_retries=5, backoff=0.5):
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Per process: a forked worker can't use its parent's threads
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='gcs-upload')
+                self._pid = os.getpid()
+            return self._pool
+
+    def _with_retries(self, blob_path, upload):
+        attempt = 0
+        while True:
+            try:
+                upload()
+                return
+            except Exception as e:
+                if _status_code(e) == ALREADY_EXISTS:
+                    return
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+                print(f"⚠️ Upload of {blob_path} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    @timed('gcs_upload')
+    def upload_file(self, local_path, blob_path, content_type='image/jpeg'):
+        """Upload one file (resumable when it's large) and return its public URL"""
+        blob = self.bucket.blob(blob_path)
+        if os.path.getsize(local_path) > RESUMABLE_THRESHOLD:
+            blob.chunk_size = CHUNK_SIZE
+
+        self._with_retries(blob_path, lambda: blob.upload_from_filename(
+            local_path, content_type=content_type, if_generation_match=0))
+        return blob.public_url
+
+    def upload_many(self, items):
+        """Upload (local_path, blob_path, content_type) items concurrently.
+
+        Returns {blob_path: url}. Waits for every upload; the first failure
+        is raised once they're all done.
+        """
+        pool = self._executor()
+        futures = [(blob_path, pool.submit(self.upload_file, local_path, blob_path, content_type))
+                   for local_path, blob_path, content_type in items]
+
+        urls, error = {}, None
+        for blob_path, future in futures:
+            try:
+                urls[blob_path] = future.result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return urls
@@ -1,57 +1,80 @@
 import os
-import uuid
-import io
-import tempfile
-from PIL import Image
-from google.cloud import storage
-from werkzeug.utils import secure_filename
-from utils.helpers import allowed_file
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from services.blob_storage import create_blob_storage
+from services.description_cache import DescriptionCache, description_key
 from config import Config
+from utils.metrics import timed
 
 class GoogleCloudService:
-    def __init__(self):
-        """Set up our Google Cloud connection"""
-        self.project_id = Config.GOOGLE_CLOUD_PROJECT
-        self.bucket_name = Config.GOOGLE_CLOUD_BUCKET
-        self.use_cloud = Config.USE_GOOGLE_CLOUD
+    def __init__(self, storage=None, gemini_model=None, config=None):
+        """Set up our Google Cloud connection (settings from config, Config by default)"""
+        config = config or Config
+        self.project_id = config.GOOGLE_CLOUD_PROJECT
+        self.bucket_name = config.GOOGLE_CLOUD_BUCKET
+        # Same blob storage as the image pipeline when the app passes it in
+        self.storage = storage or create_blob_storage('gcs' if config.USE_GOOGLE_CLOUD else 'local', config)
+        self.use_cloud = self.storage.name == 'gcs'
         
-        if self.use_cloud:
-            try:
-                self.storage_client = storage.Client()
-                self.bucket = self.storage_client.bucket(self.bucket_name)
-                print("🌩️ Connected to Google Cloud Storage!")
-            except Exception as e:
-                print(f"⚠️ Google Cloud Storage not available: {e}")
-                self.use_cloud = False
+        # Generated descriptions, and the model calls still running, by input hash
+        self.description_cache = DescriptionCache(config.AI_CACHE_SIZE, config.AI_CACHE_TTL)
+        self.ai_workers = config.AI_WORKERS
+        self.ai_timeout = config.AI_TIMEOUT
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        # The same for async callers (asgi.py): tasks on the worker's event loop
+        self._async_inflight = {}
         
-        try:
-            import google.generativeai as genai
-            
-            api_key = os.environ.get('GOOGLE_API_KEY')
-            if api_key:
-                api_key = api_key.strip('"')
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-                print("🤖 Gemini AI ready!")
-                self.ai_available = True
-            else:
-                print("⚠️ No GOOGLE_API_KEY found in environment")
-                self.ai_available = False
-                
-        except Exception as ai_error:
-            print(f"⚠️ Gemini AI not available: {ai_error}")
+        # Gemini is set up on the first description request, not here: importing
+        # the SDK alone takes about a second, which every worker would pay at startup
+        self._given_model = gemini_model
+        self._gemini_model = gemini_model
+        self._model_lock = threading.Lock()
+        if gemini_model is not None:
+            # Anything with generate_content(prompt) -> .text, e.g. a stub
+            self.ai_available = True
+        elif os.environ.get('GOOGLE_API_KEY'):
+            self.ai_available = True
+        else:
+            print("⚠️ No GOOGLE_API_KEY found in environment")
             self.ai_available = False
 
-    def enhance_product_description(self, raw_description, product_name, craft_type, materials):
-        """Use Gemini AI or fallback to create compelling product descriptions"""
-        try:
-            if not self.ai_available:
-                print("📝 Using fallback text enhancement")
-                return self._fallback_enhance_description(raw_description, product_name, craft_type, materials)
-            
-            materials_text = ', '.join(materials) if materials else 'Traditional materials'
-            
-            prompt = f"""You are a master storyteller for Indian artisans. Create a short (3 sentences max), deeply personal product description that evokes emotion and cultural heritage.
+    def after_fork(self):
+        """gRPC channels and threads don't survive fork - set Gemini up again on first use"""
+        self._gemini_model = self._given_model
+        self._model_lock = threading.Lock()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._async_inflight = {}
+        self.storage.after_fork()
+
+    @property
+    def gemini_model(self):
+        """The Gemini model, configured on first use (thread-safe)"""
+        if self._gemini_model is None:
+            with self._model_lock:
+                if self._gemini_model is None:
+                    try:
+                        import google.generativeai as genai
+                        
+                        genai.configure(api_key=os.environ.get('GOOGLE_API_KEY', '').strip('"'))
+                        self._gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+                        print("🤖 Gemini AI ready!")
+                    except Exception as ai_error:
+                        print(f"⚠️ Gemini AI not available: {ai_error}")
+                        self.ai_available = False
+                        raise
+        return self._gemini_model
+
+    def _build_prompt(self, raw_description, product_name, craft_type, materials):
+        materials_text = ', '.join(materials) if materials else 'Traditional materials'
+        
+        return f"""You are a master storyteller for Indian artisans. Create a short (3 sentences max), deeply personal product description that evokes emotion and cultural heritage.
 
 **CONTEXT:**
 * Product: {product_name}
@@ -71,152 +94,159 @@ class GoogleCloudService:
 
 Now, create the soulful narrative.
 """
-            
-            # Call Gemini AI
-            response = self.gemini_model.generate_content(prompt)
-            enhanced_text = response.text.strip()
+    
+    def _executor(self):
+        # Per process: a forked worker can't use its parent's threads
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.ai_workers, thread_name_prefix='gemini')
+                self._pid = os.getpid()
+            return self._pool
+    
+    @timed('gemini_call')
+    def _call_model(self, prompt):
+        # Call Gemini AI
+        response = self.gemini_model.generate_content(prompt)
+        return response.text.strip()
+    
+    def _run_model(self, key, prompt, future):
+        try:
+            enhanced_text = self._call_model(prompt)
+            self.description_cache.put(key, enhanced_text)
             print(f"✨ Description enhanced with Gemini AI!")
-            return enhanced_text
-            
+            future.set_result(enhanced_text)
         except Exception as e:
-            print(f"⚠️ AI enhancement failed: {e}")
-            print("📝 Using fallback text enhancement")
-            return self._fallback_enhance_description(raw_description, product_name, craft_type, materials)
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
     
-    def _fallback_enhance_description(self, raw_description, product_name, craft_type, materials):
-        """Fallback text enhancement when AI is not available"""
-        materials_text = ', '.join(materials) if materials else 'traditional materials'
-        
-        enhanced = f"This exquisite handcrafted {product_name.lower()} showcases the artistry of {craft_type.lower()} masters, featuring {raw_description.lower()} using {materials_text}. Each piece reflects skilled craftsmanship and celebrates India's rich cultural heritage, bringing authentic traditional artistry to your collection."
+    def _generate_once(self, key, prompt):
+        """Future for the model's answer; identical requests in flight share one call"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = Future()
         
-        print("✨ Description enhanced with fallback method!")
-        return enhanced
+        if self.ai_workers:
+            self._executor().submit(self._run_model, key, prompt, future)
+        else:
+            self._run_model(key, prompt, future)
+        return future
     
-    def _generate_unique_filename(self, original_filename):
-        """Create a unique name for the file so no two files have same name"""
-        _, ext = os.path.splitext(original_filename)
-        unique_name = str(uuid.uuid4())
-        return secure_filename(f"{unique_name}{ext}")
+    def generate_description(self, raw_description, product_name, craft_type, materials, timeout=None):
+        """Gemini's description, or an exception - no fallback here.
+
+        Answers are cached by their inputs. With AI_WORKERS set the model
+        runs on a helper thread and we wait at most timeout seconds
+        (AI_TIMEOUT by default); a late answer still lands in the cache
+        for next time.
+        """
+        if not self.ai_available:
+            raise RuntimeError('Gemini AI is not available')
+        
+        key = description_key(raw_description, product_name, craft_type, materials)
+        cached = self.description_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        prompt = self._build_prompt(raw_description, product_name, craft_type, materials)
+        future = self._generate_once(key, prompt)
+        try:
+            return future.result(timeout=timeout or self.ai_timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"Gemini took longer than {timeout or self.ai_timeout}s")
     
-    def _enhance_image_with_ai(self, image_bytes):
-        """Use AI to make images look better (simplified for demo)"""
+    def enhance_product_description(self, raw_description, product_name, craft_type, materials, timeout=None):
+        """Use Gemini AI or fallback to create compelling product descriptions"""
         try:
-            print("🤖 Enhancing image with AI...")
-            
-            img = Image.open(io.BytesIO(image_bytes))
-            
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            img.thumbnail((800, 600), Image.Resampling.LANCZOS)
-            
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=90, optimize=True)
+            if not self.ai_available:
+                print("📝 Using fallback text enhancement")
+                return self.fallback_description(raw_description, product_name, craft_type, materials)
             
-            print("✨ Image enhanced successfully!")
-            return output.getvalue()
+            return self.generate_description(raw_description, product_name, craft_type, materials, timeout)
             
         except Exception as e:
-            print(f"⚠️ Image enhancement failed: {e}")
-            return image_bytes
+            print(f"⚠️ AI enhancement failed: {e}")
+            print("📝 Using fallback text enhancement")
+            return self.fallback_description(raw_description, product_name, craft_type, materials)
+    
+    # Async versions, for the event loop in asgi.py: same cache, but waiting
+    # on Gemini doesn't hold a thread
+    @timed('gemini_call')
+    async def _call_model_async(self, prompt):
+        loop = asyncio.get_running_loop()
+        # Setting the model up imports the SDK - keep that off the event loop
+        model = self._gemini_model or await loop.run_in_executor(None, lambda: self.gemini_model)
+        if hasattr(model, 'generate_content_async'):
+            response = await model.generate_content_async(prompt)
+        else:
+            # A stub without an async API
+            response = await loop.run_in_executor(None, model.generate_content, prompt)
+        return response.text.strip()
     
-    def upload_product_image(self, file, product_id):
-        """Upload product image with AI enhancement"""
+    async def _run_model_async(self, key, prompt):
         try:
-            if not file or file.filename == '':
-                return {'success': False, 'error': 'No file selected'}
-            
-            if not allowed_file(file.filename):
-                return {'success': False, 'error': 'Only image files allowed'}
-            
-            print(f"📸 Uploading image for product {product_id}...")
-            
-
-            file_content = file.read()
-            
-            enhanced_content = self._enhance_image_with_ai(file_content)
-            
-            filename = self._generate_unique_filename(file.filename)
-            
-            if self.use_cloud:
-                blob_path = f"products/{product_id}/{filename}"
-                blob = self.bucket.blob(blob_path)
-                
-                blob.upload_from_string(
-                    enhanced_content,
-                    content_type='image/jpeg'
-                )
-                
-                blob.make_public()
-                
-                url = blob.public_url
-                storage_type = "Google Cloud Storage"
-                
-            else:
-                product_dir = os.path.join('uploads/products', product_id)
-                os.makedirs(product_dir, exist_ok=True)
-                
-                file_path = os.path.join(product_dir, filename)
-                with open(file_path, 'wb') as f:
-                    f.write(enhanced_content)
-                
-                url = f"uploads/products/{product_id}/{filename}"
-                storage_type = "Local Storage"
-            
-            print(f"✅ Image uploaded successfully to {storage_type}!")
-            
-            return {
-                'success': True,
-                'filename': filename,
-                'url': url,
-                'enhanced': True,
-                'storage_type': storage_type,
-                'ai_enhanced': True
-            }
-            
-        except Exception as e:
-            print(f"❌ Upload failed: {e}")
-            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+            enhanced_text = await self._call_model_async(prompt)
+            self.description_cache.put(key, enhanced_text)
+            print(f"✨ Description enhanced with Gemini AI!")
+            return enhanced_text
+        finally:
+            self._async_inflight.pop(key, None)
     
-    def upload_profile_image(self, file, artisan_id):
-        """Upload artisan profile image with AI enhancement"""
+    async def generate_description_async(self, raw_description, product_name, craft_type, materials, timeout=None):
+        """generate_description(), awaited on the event loop instead of a helper thread"""
+        if not self.ai_available:
+            raise RuntimeError('Gemini AI is not available')
+        
+        key = description_key(raw_description, product_name, craft_type, materials)
+        cached = self.description_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Only touched from the event loop's thread, so no lock
+        task = self._async_inflight.get(key)
+        if task is None:
+            prompt = self._build_prompt(raw_description, product_name, craft_type, materials)
+            task = self._async_inflight[key] = asyncio.ensure_future(self._run_model_async(key, prompt))
+            # Nobody may be left waiting for a late failure - don't let asyncio complain about it
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
         try:
-            if not file or file.filename == '':
-                return {'success': False, 'error': 'No file selected'}
-            
-            if not allowed_file(file.filename):
-                return {'success': False, 'error': 'Only image files allowed'}
-            
-            print(f"👤 Uploading profile image for artisan {artisan_id}...")
-            
-            file_content = file.read()
-            enhanced_content = self._enhance_image_with_ai(file_content)
-            filename = self._generate_unique_filename(file.filename)
-            
-            if self.use_cloud:
-                blob_path = f"profiles/{filename}"
-                blob = self.bucket.blob(blob_path)
-                blob.upload_from_string(enhanced_content, content_type='image/jpeg')
-                blob.make_public()
-                url = blob.public_url
-                storage_type = "Google Cloud Storage"
-            else:
-                file_path = os.path.join('uploads/profiles', filename)
-                with open(file_path, 'wb') as f:
-                    f.write(enhanced_content)
-                url = f"uploads/profiles/{filename}"
-                storage_type = "Local Storage"
-            
-            print(f"✅ Profile image uploaded to {storage_type}!")
+            # Shielded: giving up on the answer doesn't cancel it, it still gets cached
+            return await asyncio.wait_for(asyncio.shield(task), timeout or self.ai_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Gemini took longer than {timeout or self.ai_timeout}s")
+    
+    async def enhance_product_description_async(self, raw_description, product_name, craft_type, materials, timeout=None):
+        """enhance_product_description() for async callers"""
+        try:
+            if not self.ai_available:
+                print("📝 Using fallback text enhancement")
+                return self.fallback_description(raw_description, product_name, craft_type, materials)
             
-            return {
-                'success': True,
-                'filename': filename,
-                'url': url,
-                'enhanced': True,
-                'storage_type': storage_type,
-                'ai_enhanced': True
-            }
+            return await self.generate_description_async(raw_description, product_name, craft_type, materials, timeout)
             
         except Exception as e:
-            return {'success': False, 'error': f'Upload failed: {str(e)}'}
\ No newline at end of file
+            print(f"⚠️ AI enhancement failed: {e}")
+            print("📝 Using fallback text enhancement")
+            return self.fallback_description(raw_description, product_name, craft_type, materials)
+    
+    def generate_description_uncached(self, raw_description, product_name, craft_type, materials):
+        """Gemini's description, called right here - no cache, single-flight, timeout or fallback.
+
+        For bulk jobs (description_batch) that bring their own threads and
+        rate limit, and whose inputs are all new anyway.
+        """
+        if not self.ai_available:
+            raise RuntimeError('Gemini AI is not available')
+        return self._call_model(self._build_prompt(raw_description, product_name, craft_type, materials))
+    
+    def fallback_description(self, raw_description, product_name, craft_type, materials):
+        """Fallback text enhancement when AI is not available"""
+        materials_text = ', '.join(materials) if materials else 'traditional materials'
+        
+        enhanced = f"This exquisite handcrafted {product_name.lower()} showcases the artistry of {craft_type.lower()} masters, featuring {raw_description.lower()} using {materials_text}. Each piece reflects skilled craftsmanship and celebrates India's rich cultural heritage, bringing authentic traditional artistry to your collection."
+        
+        print("✨ Description enhanced with fallback method!")
+        return enhanced
@@ -0,0 +1,228 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.helpers import get_timestamp, load_json_data, save_json_data
+
+# Finished job records older than this get swept on startup
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+
+class ImageJobQueue:
+    """Runs image processing off the request thread.
+
+    The decode/resize/encode work goes to a small process pool. The
+    follow-up (publishing the file, recording its URL) runs on a helper
+    thread in this process. Every status change is written to jobs_dir,
+    so any worker process can answer a status request.
+    """
+
+    def __init__(self, jobs_dir, max_workers=None, max_pending=64):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._jobs = {}
+        # Work already running, by content key, so identical uploads share it
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._finisher = None
+        self._pid = None
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.cleanup()
+
+    def _executors(self):
+        # Created on first use, and again in a forked child - executors don't survive fork
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._finisher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-jobs')
+                self._pid = os.getpid()
+            return self._pool, self._finisher
+
+    def after_fork(self):
+        """A forked worker starts with no jobs and its own pools (created on first use)"""
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = self._finisher = None
+        self._pid = None
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        save_json_data(job, self._job_path(job['id']))
+
+    def _new_job(self, kind, owner_id, **fields):
+        """Register a job, or None when the queue is full"""
+        now = get_timestamp()
+        job = {
+            'id': str(uuid.uuid4()),
+            'kind': kind,
+            'owner_id': owner_id,
+            'status': 'queued',
+            'url': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        job.update(fields)
+        with self._lock:
+            if len(self._jobs) >= self.max_pending:
+                return None
+            self._jobs[job['id']] = job
+        self._save(job)
+        return job
+
+    def submit(self, kind, owner_id, task, on_done, url=None, key=None, discard=None):
+        """Queue task - (function, *args) - to run in the worker pool.
+
+        The function must be importable at module level (it is pickled over
+        to a worker). on_done(result) runs here once it finishes and returns
+        the final URL. Jobs with the same key while one is still running
+        share its result instead of running again (and the file named by
+        discard, the duplicate's own input, is removed). Returns the job
+        record, or None when the queue is full.
+        """
+        job = self._new_job(kind, owner_id, url=url)
+        if job is None:
+            return None
+
+        _, finisher = self._executors()
+        future = self._run(task, key, discard)
+        future.add_done_callback(lambda f: finisher.submit(self._finish, job, on_done, f.result))
+        return dict(job)
+
+    def submit_batch(self, kind, owner_id, items, on_done, urls=None):
+        """One job for several tasks, run side by side in the pool.
+
+        items are (task, key, discard) like submit()'s arguments. on_done
+        gets every outcome, in order - a result, or the exception that task
+        raised - once the last one is in, and returns a dict of fields to
+        record on the job (e.g. the URLs it saved in a single write).
+        """
+        job = self._new_job(kind, owner_id, urls=urls or [])
+        if job is None:
+            return None
+
+        _, finisher = self._executors()
+        futures = [self._run(task, key, discard) for task, key, discard in items]
+        remaining = [len(futures)]
+        counter = threading.Lock()
+
+        def outcomes():
+            return [f.exception() or f.result() for f in futures]
+
+        def one_done(_):
+            with counter:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                finisher.submit(self._finish, job, on_done, outcomes)
+
+        for future in futures:
+            future.add_done_callback(one_done)
+        return dict(job)
+
+    def _run(self, task, key=None, discard=None):
+        """Future for task, shared with a running one that has the same key"""
+        with self._lock:
+            future = self._inflight.get(key) if key is not None else None
+        if future is not None:
+            if discard and os.path.exists(discard):
+                os.remove(discard)
+            return future
+
+        future = self._start(tuple(task))
+        if key is not None:
+            with self._lock:
+                self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _start(self, args):
+        pool, _ = self._executors()
+        try:
+            return pool.submit(*args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge image) - start a fresh pool
+            print("⚠️ Image worker pool broke, restarting it")
+            with self._lock:
+                self._pool = None
+            pool, _ = self._executors()
+            return pool.submit(*args)
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _finish(self, job, on_done, result):
+        try:
+            outcome = on_done(result())
+            if isinstance(outcome, dict):
+                job.update(outcome)
+            else:
+                job['url'] = outcome
+            job['status'] = 'done'
+        except Exception as e:
+            print(f"❌ Image job {job['id']} failed: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        job['updated_at'] = get_timestamp()
+
+        # On disk first, so a status request never finds the job missing
+        self._save(job)
+        with self._lock:
+            self._jobs.pop(job['id'], None)
+
+    def get(self, job_id):
+        """Current job record, or None if we've never heard of it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        path = self._job_path(job_id)
+        if not os.path.exists(path):
+            return None
+        return load_json_data(path)
+
+    def pending(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def wait(self, timeout=None):
+        """Block until every job queued here has finished"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            pool, finisher = self._pool, self._finisher
+            self._pool = self._finisher = None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=True)
+            finisher.shutdown(wait=True)
+
+    def cleanup(self, max_age=JOB_RETENTION_SECONDS):
+        """Remove old job records"""
+        cutoff = time.time() - max_age
+        try:
+            for name in os.listdir(self.jobs_dir):
+                path = os.path.join(self.jobs_dir, name)
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        except OSError as e:
+            print(f"Job cleanup error: {e}")
@@ -0,0 +1,174 @@
+import os
+import uuid
+import shutil
+import threading
+from werkzeug.utils import secure_filename
+from utils.helpers import allowed_file
+from utils.image_variants import primary_name
+from services.blob_storage import content_type_for
+from services.image_store import ImageStore
+from services.image_processing import check_image, process_upload, process_product_upload, ImageRejected
+from config import Config
+
+PROFILE_SIZE = (400, 400)
+
+
+class ImagePipeline:
+    """The one path every image upload takes, whichever route it came in on.
+
+    stage_*() saves the raw upload to incoming_dir and checks it; *_task()
+    is the (function, *args) the image workers run, writing into a scratch
+    folder next to it; publish_*() moves the results into blob storage.
+    Where they end up (disk, bucket, memory) is up to the storage backend,
+    and every route processes with the same settings.
+    """
+
+    def __init__(self, storage, incoming_dir="uploads/incoming", refs_dir="uploads/images", quality=None):
+        self.storage = storage
+        self.incoming_dir = incoming_dir
+        self.quality = quality or Config.IMAGE_QUALITY
+        # Part of the content key, so changing the settings means reprocessing
+        self.profile = f"q{self.quality}"
+        self.store = ImageStore(storage, refs_dir)
+        os.makedirs(incoming_dir, exist_ok=True)
+
+        # Keys being published right now, so jobs sharing one result don't collide
+        self._publishing = {}
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._publishing = {}
+        self._lock = threading.Lock()
+        self.store.after_fork()
+
+    def _raw_path(self, original_filename):
+        _, ext = os.path.splitext(original_filename)
+        return os.path.join(self.incoming_dir, secure_filename(f"{uuid.uuid4()}{ext}"))
+
+    def _check_file(self, file):
+        if not file or file.filename == '':
+            return {'success': False, 'error': 'No file selected'}
+        if not allowed_file(file.filename):
+            return {'success': False, 'error': 'Only image files allowed (PNG, JPG, JPEG, GIF, WEBP)'}
+        return None
+
+    def _check_upload(self, raw_path):
+        """Turn away unreadable or oversized images before any work is queued"""
+        try:
+            check_image(raw_path)
+            return None
+        except ImageRejected as e:
+            os.remove(raw_path)
+            return {'success': False, 'error': str(e)}
+
+    # Staging (request thread)
+    def stage_product_image(self, file):
+        """Save a product image upload as-is, keyed by its content hash.
+
+        When that key has been processed before, 'cached' is True and
+        there's nothing left to do.
+        """
+        try:
+            problem = self._check_file(file)
+            if problem:
+                return problem
+
+            # Hash while copying to disk, so the upload is only read once
+            raw_path = self._raw_path(file.filename)
+            with open(raw_path, 'wb') as out:
+                key = self.store.hash_stream(file.stream, self.profile, out)
+            rejected = self._check_upload(raw_path)
+            if rejected:
+                return rejected
+
+            cached = self.store.exists(key)
+            if cached:
+                os.remove(raw_path)
+                raw_path = None
+
+            return {
+                'success': True,
+                'filename': f"{key}/{primary_name()}",
+                'url': self.store.url(key),
+                'raw_path': raw_path,
+                'work_path': f"{raw_path}.out" if raw_path else None,
+                'content_key': key,
+                'cached': cached
+            }
+        except Exception as e:
+            return {'success': False, 'error': f'Upload problem: {str(e)}'}
+
+    def stage_profile_image(self, file):
+        """Save a profile photo upload as-is; the resize happens later"""
+        try:
+            problem = self._check_file(file)
+            if problem:
+                return problem
+
+            raw_path = self._raw_path(file.filename)
+            file.save(raw_path)
+            rejected = self._check_upload(raw_path)
+            if rejected:
+                return rejected
+
+            filename = os.path.basename(raw_path)
+            blob_key = f"profiles/{filename}"
+            return {
+                'success': True,
+                'filename': filename,
+                'url': self.storage.url(blob_key),
+                'blob_key': blob_key,
+                'raw_path': raw_path,
+                'work_path': f"{raw_path}.out"
+            }
+        except Exception as e:
+            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+
+    # Worker tasks
+    def product_task(self, staged):
+        """Every size and format of the image"""
+        return (process_product_upload, staged['raw_path'], staged['work_path'], self.quality)
+
+    def profile_task(self, staged):
+        return (process_upload, staged['raw_path'], staged['work_path'], *PROFILE_SIZE, self.quality)
+
+    # Publishing (finisher thread)
+    def publish_product_image(self, staged, paths):
+        """Move a finished set of variants into storage under its content key"""
+        key = staged['content_key']
+        while True:
+            with self._lock:
+                busy = self._publishing.get(key)
+                if busy is None:
+                    done = self._publishing[key] = threading.Event()
+                    break
+            busy.wait()
+
+        try:
+            # Jobs that shared this result get the same paths; whatever is
+            # still here hasn't been published yet
+            prefix = self.store.prefix(key)
+            items = [(path, f"{prefix}/{os.path.basename(path)}", content_type_for(path))
+                     for path in paths if os.path.exists(path)]
+            # The primary goes last: once it's there, the image counts as stored
+            items.sort(key=lambda item: os.path.basename(item[0]) == primary_name())
+            if items:
+                self.storage.put_files(items)
+                print(f"✅ {len(items)} image variants saved to {self.storage.label}")
+            elif not self.store.exists(key):
+                raise ValueError('Processed image went missing')
+        finally:
+            if staged['work_path']:
+                shutil.rmtree(staged['work_path'], ignore_errors=True)
+            with self._lock:
+                self._publishing.pop(key, None)
+            done.set()
+        return self.store.url(key)
+
+    def publish_profile_image(self, staged, path):
+        return self.storage.put_file(path, staged['blob_key'], 'image/jpeg')
+
+    def discard(self, staged):
+        """Drop a staged upload that won't be processed"""
+        if staged.get('raw_path') and os.path.exists(staged['raw_path']):
+            os.remove(staged['raw_path'])
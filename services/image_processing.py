@@ -0,0 +1,142 @@
+import os
+import math
+import shutil
+from PIL import Image
+from utils.image_variants import VARIANT_WIDTHS, VARIANT_FORMATS, ORIGINAL, variant_name
+from config import Config
+from utils.metrics import timer
+
+# The 'full' variant is the upload itself, only scaled down if it's bigger than this
+ORIGINAL_MAX_SIZE = 2048
+WEBP_METHOD = 4  # 0-6, higher is smaller but slower
+# Refuse anything bigger before decoding a single pixel (decompression bombs, 100MP panoramas)
+MAX_IMAGE_PIXELS = Config.MAX_IMAGE_PIXELS
+
+# Plain module-level functions so they can run in a worker process
+
+
+class ImageRejected(ValueError):
+    """Not an image we can (or are willing to) decode"""
+
+
+def open_image(src, target_size=None, max_pixels=None):
+    """Open src (a path or file object) lazily, with its memory use bounded.
+
+    Only the header is read here. The pixel count is checked against
+    max_pixels, and for JPEGs the decoder is told to scale down by 1/2 to
+    1/8 while decoding (draft mode), so a big phone photo is never held
+    in memory at full size when we only want target_size.
+    """
+    max_pixels = max_pixels or MAX_IMAGE_PIXELS
+    try:
+        img = Image.open(src)
+    except Image.DecompressionBombError:
+        raise ImageRejected("Image is too large")
+    except OSError:
+        raise ImageRejected("Not a readable image file")
+
+    width, height = img.size
+    if width * height > max_pixels:
+        img.close()
+        raise ImageRejected(f"Image is too large ({width}x{height}); the limit is {max_pixels:,} pixels")
+
+    if target_size and img.format == 'JPEG':
+        # Ask for the size a thumbnail into target_size will come out at; the
+        # decoder picks the smallest DCT scale that still covers it
+        fit = min(target_size[0] / width, target_size[1] / height, 1)
+        img.draft(None, (math.ceil(width * fit), math.ceil(height * fit)))
+    return img
+
+
+def check_image(src, max_pixels=None):
+    """(width, height) of an upload, or ImageRejected - reads the header only"""
+    with open_image(src, max_pixels=max_pixels) as img:
+        return img.size
+
+
+
+def resize_image(src_path, dest_path, max_width=800, max_height=600, quality=85):
+    """Shrink an upload to web size and save it as JPEG at dest_path"""
+    with open_image(src_path, (max_width, max_height)) as img:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+
+        with timer('image_resize'):
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+        # Write next to the target and swap it in, so nobody serves half a file
+        tmp_path = f"{dest_path}.tmp.{os.getpid()}"
+        try:
+            img.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+            os.replace(tmp_path, dest_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return dest_path
+
+
+def process_upload(src_path, dest_path, max_width=800, max_height=600, quality=85):
+    """Worker entry point: resize the raw upload, then drop it"""
+    try:
+        return resize_image(src_path, dest_path, max_width, max_height, quality)
+    finally:
+        if os.path.exists(src_path):
+            os.remove(src_path)
+
+
+def _save_variant(img, path, fmt, quality):
+    if fmt == 'webp':
+        img.save(path, 'WEBP', quality=quality, method=WEBP_METHOD)
+    else:
+        img.save(path, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+
+def make_variants(src_path, dest_dir, quality=85):
+    """Write every width/format variant of an image into dest_dir.
+
+    Each size is scaled down from the previous one rather than from the
+    full original, which is much cheaper for big photos. The folder is
+    built under a temporary name and renamed into place when complete.
+    Returns the paths written.
+    """
+    tmp_dir = f"{dest_dir}.tmp.{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        with open_image(src_path, (ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE)) as img:
+            img = img.convert('RGB') if img.mode != 'RGB' else img
+            with timer('image_resize'):
+                img.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.Resampling.LANCZOS)
+
+            names = []
+            sizes = [(ORIGINAL, None)] + [(w, w) for w in sorted(VARIANT_WIDTHS, reverse=True)]
+            for size, width in sizes:
+                if width is not None:
+                    # Bound by width (that's what srcset describes), within reason for tall images
+                    with timer('image_resize'):
+                        img.thumbnail((width, width * 2), Image.Resampling.LANCZOS)
+                for fmt in VARIANT_FORMATS:
+                    name = variant_name(size, fmt)
+                    _save_variant(img, os.path.join(tmp_dir, name), fmt, quality)
+                    names.append(name)
+
+        try:
+            os.replace(tmp_dir, dest_dir)
+        except OSError:
+            # Another worker built the same image first - theirs is identical
+            if not os.path.isdir(dest_dir):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return [os.path.join(dest_dir, name) for name in names]
+
+
+def process_product_upload(src_path, dest_dir, quality=85):
+    """Worker entry point: build all variants of the raw upload, then drop it"""
+    try:
+        return make_variants(src_path, dest_dir, quality)
+    finally:
+        if os.path.exists(src_path):
+            os.remove(src_path)
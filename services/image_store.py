@@ -0,0 +1,180 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from utils.helpers import load_json_data, save_json_data
+from utils.image_variants import primary_name
+from utils.locks import FileLock
+
+HASH_CHUNK_SIZE = 64 * 1024
+# A folder this new may just be waiting for its first reference
+CLEANUP_GRACE_SECONDS = 10 * 60
+
+_KEY = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ImageStore:
+    """Processed images keyed by a hash of what was uploaded.
+
+    Every distinct upload gets one set of variants in blob storage,
+    images/<ab>/<hash>/, however many products use it. refs.json (kept
+    on local disk in refs_dir) maps each hash to the product ids that
+    reference it, so the blobs are only removed once nobody does.
+    """
+
+    def __init__(self, storage, refs_dir="uploads/images"):
+        self.storage = storage
+        self.refs_dir = refs_dir
+        self.refs_path = os.path.join(refs_dir, "refs.json")
+        os.makedirs(refs_dir, exist_ok=True)
+        # Shared between worker processes, like the catalog lock
+        self._file_lock = FileLock(os.path.join(refs_dir, ".refs.lock"))
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        # The file lock reopens itself in a new process
+        self._lock = threading.Lock()
+
+    # Keys and paths
+    @staticmethod
+    def hash_stream(stream, profile, out=None):
+        """Hash an upload (and the settings it'll be processed with), copying it to out as we go"""
+        digest = hashlib.sha256(profile.encode('utf-8') + b'\0')
+        while True:
+            chunk = stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if out is not None:
+                out.write(chunk)
+        return digest.hexdigest()
+
+    def prefix(self, key):
+        """Where key's variants live in blob storage"""
+        return f"images/{key[:2]}/{key}"
+
+    def url(self, key):
+        return self.storage.url(f"{self.prefix(key)}/{primary_name()}")
+
+    def key_from_url(self, url):
+        """Hash for one of our URLs (local or bucket), or None"""
+        parts = (url or '').rstrip('/').split('/')
+        if len(parts) >= 2 and _KEY.match(parts[-2]):
+            return parts[-2]
+        return None
+
+    def exists(self, key):
+        """Already processed - still referenced, or its files are in storage"""
+        if key in self._load_refs():
+            return True
+        return self.storage.exists(f"{self.prefix(key)}/{primary_name()}")
+
+    # Reference counts
+    def _load_refs(self):
+        if not os.path.exists(self.refs_path):
+            return {}
+        return load_json_data(self.refs_path) or {}
+
+    def _update_refs(self, change):
+        """Read-modify-write refs.json under both locks; change(refs) returns a result"""
+        with self._lock, self._file_lock:
+            refs = self._load_refs()
+            result = change(refs)
+            save_json_data(refs, self.refs_path)
+            return result
+
+    def add_ref(self, key, owner_id):
+        return self.add_refs([key], owner_id)[0]
+
+    def add_refs(self, keys, owner_id):
+        """Reference several images from one owner in a single refs.json update.
+
+        An image nobody references yet must still be in storage; it's
+        checked under the lock, so it can't be removed halfway through.
+        """
+        def change(refs):
+            counts = []
+            for key in keys:
+                owners = refs.setdefault(key, [])
+                if not owners and not self.storage.exists(f"{self.prefix(key)}/{primary_name()}"):
+                    raise ValueError('Image is no longer stored, please upload it again')
+                if owner_id not in owners:
+                    owners.append(owner_id)
+                counts.append(len(owners))
+            return counts
+        return self._update_refs(change)
+
+    def release(self, key, owner_id):
+        """Drop owner_id's reference; removes the files once nobody references them.
+
+        Returns how many references are left. The files go while the refs
+        lock is still held, so a concurrent add_refs() can't take a new
+        reference on them halfway through.
+        """
+        if owner_id is None:
+            raise ValueError('release() needs the owner whose reference to drop')
+
+        def change(refs):
+            owners = refs.get(key, [])
+            if owner_id in owners:
+                owners.remove(owner_id)
+            if owners:
+                refs[key] = owners
+            else:
+                refs.pop(key, None)
+                self._remove(key)
+            return len(owners)
+
+        return self._update_refs(change)
+
+    def keys_for(self, owner_id):
+        return [key for key, owners in self._load_refs().items() if owner_id in owners]
+
+    def ref_count(self, key):
+        return len(self._load_refs().get(key, []))
+
+    def _remove(self, key):
+        self.storage.delete_prefix(self.prefix(key))
+        print(f"Removed unreferenced image {key}")
+
+    def cleanup(self, valid_owner_ids, grace=CLEANUP_GRACE_SECONDS):
+        """Forget owners that no longer exist and delete every unreferenced image"""
+        valid = set(valid_owner_ids)
+
+        def change(refs):
+            dropped = []
+            for key in list(refs):
+                owners = [o for o in refs[key] if o in valid]
+                if owners:
+                    refs[key] = owners
+                else:
+                    del refs[key]
+                    self._remove(key)
+                    dropped.append(key)
+            return set(refs), dropped
+
+        referenced, dropped = self._update_refs(change)
+        removed = len(dropped)
+
+        # Images nobody ever referenced (e.g. the product vanished mid-upload)
+        newest = {}
+        for name, modified in self.storage.list("images"):
+            parts = name.split('/')
+            if len(parts) == 4 and _KEY.match(parts[2]):
+                newest[parts[2]] = max(modified, newest.get(parts[2], 0))
+
+        cutoff = time.time() - grace
+        stale = [key for key, modified in newest.items()
+                 if key not in referenced and key not in dropped and modified < cutoff]
+
+        def remove_stale(refs):
+            # Checked again under the lock - one may have been referenced since
+            gone = [key for key in stale if key not in refs]
+            for key in gone:
+                self._remove(key)
+            return len(gone)
+
+        if stale:
+            removed += self._update_refs(remove_stale)
+        return removed
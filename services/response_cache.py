@@ -0,0 +1,80 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_etag(version, key):
+    """Strong ETag: the body is fully determined by the data version and the request key"""
+    return hashlib.sha1(f"{version}|{key!r}".encode('utf-8')).hexdigest()
+
+
+class CachedResponse:
+    __slots__ = ('version', 'etag', 'body', 'mimetype', 'expires_at')
+
+    def __init__(self, version, etag, body, mimetype, expires_at):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, each tied to a data version.
+
+    An entry is only served while the catalog is still at the version it
+    was built from and its TTL hasn't run out; any write moves the
+    version on, which invalidates everything at once. Bounded by both
+    entry count and total body bytes, since a single unpaginated listing
+    can be megabytes.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        entry = CachedResponse(version, make_etag(version, key), body, mimetype,
+                               time.monotonic() + self.ttl)
+        # Too big to keep at all - hand it back uncached rather than flush everything else
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self.bytes += len(body)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, key):
+        # Caller holds the lock
+        self.bytes -= len(self._entries.pop(key).body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,364 @@
+import re
+import math
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+
+# How much a hit in each field counts towards term frequency
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'tags': 2.0,
+    'materials': 2.0,
+    'description': 1.0,
+}
+
+# BM25 tuning
+K1 = 1.2
+B = 0.75
+
+# Prefix expansion limits - keeps one-letter-ish queries from touching the whole vocabulary.
+# Past MAX_PREFIX_TERMS only the terms in the most documents are kept.
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_TERMS = 64
+PREFIX_PENALTY = 0.8
+
+# An impact-ordered posting list is re-sorted once the average document
+# length has drifted this far from the one it was sorted with
+IMPACT_DRIFT = 0.1
+
+
+def tokenize(text):
+    """Lowercase word tokens from a string"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def _impact(tf, doc_len, avg_len):
+    """BM25 term-frequency part of a score, before the idf"""
+    return tf * (K1 + 1) / (tf + K1 * (1 - B + B * doc_len / avg_len))
+
+
+class SearchIndex:
+    """Inverted index over product name, description, materials and tags.
+
+    Query tokens are ANDed together; each one matches its exact term and,
+    when long enough, the terms it is a prefix of. Results are ranked with
+    BM25 over field-weighted term frequencies.
+
+    A search for the top `limit` only scores as much as it needs to: it
+    walks posting lists best-impact-first and stops once no document it
+    hasn't reached can beat the ones it has. The impact-ordered lists are
+    built the first time a term is searched and kept up to date after.
+    How soon it can stop depends on the query - when the rarest token
+    scores all its documents about the same (every 'vase' has it in its
+    name and tags), ANDing in a common word still means walking a good
+    part of that token's list.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._total_len = 0.0
+        # Sorted vocabulary for prefix lookups
+        self._vocab: List[str] = []
+        # term -> [average length the impacts were worked out with, [(-impact, doc_id)] sorted,
+        #          lowest and highest tf in the postings (only ever too wide after a remove)]
+        self._impacts: Dict[str, list] = {}
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def _weighted_terms(self, product):
+        terms = defaultdict(float)
+        fields = {
+            'name': [product.name],
+            'description': [product.description],
+            'materials': product.materials or [],
+            'tags': product.tags or [],
+        }
+        for field, values in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for value in values:
+                for token in tokenize(value):
+                    terms[token] += weight
+        return terms
+
+    def add(self, doc_id, product):
+        """Index a product, replacing whatever was indexed for it before"""
+        self.remove(doc_id)
+
+        terms = self._weighted_terms(product)
+        doc_len = sum(terms.values())
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                insort(self._vocab, term)
+            postings[doc_id] = tf
+            cached = self._impacts.get(term)
+            if cached is not None:
+                insort(cached[1], (-_impact(tf, doc_len, cached[0]), doc_id))
+                cached[2] = min(cached[2], tf)
+                cached[3] = max(cached[3], tf)
+
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = doc_len
+        self._total_len += doc_len
+
+    def remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        doc_len = self._doc_len.pop(doc_id)
+        for term, tf in terms.items():
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                self._impacts.pop(term, None)
+                i = bisect_left(self._vocab, term)
+                if i < len(self._vocab) and self._vocab[i] == term:
+                    del self._vocab[i]
+                continue
+
+            cached = self._impacts.get(term)
+            if cached is not None:
+                entries = cached[1]
+                entry = (-_impact(tf, doc_len, cached[0]), doc_id)
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+        self._total_len -= doc_len
+
+    def _expand(self, token, allow_prefix=True):
+        """Terms a query token matches, with a weight for each"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+            if not allow_prefix:
+                return matches
+
+        if len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect_left(self._vocab, token)
+            end = bisect_left(self._vocab, token[:-1] + chr(ord(token[-1]) + 1))
+            terms = [term for term in self._vocab[start:end] if term != token]
+            if len(terms) > MAX_PREFIX_TERMS - len(matches):
+                # Drop the rarest ones, so what's lost is as few documents as can be
+                terms = heapq.nlargest(MAX_PREFIX_TERMS - len(matches), terms,
+                                       key=lambda term: len(self.postings[term]))
+            for term in terms:
+                matches[term] = PREFIX_PENALTY
+
+        return matches
+
+    def _impact_list(self, term, avg_len):
+        """[average length, entries, min tf, max tf] for term, best impact first"""
+        cached = self._impacts.get(term)
+        if cached is None or abs(cached[0] / avg_len - 1) > IMPACT_DRIFT:
+            doc_len = self._doc_len
+            postings = self.postings[term]
+            entries = sorted((-_impact(tf, doc_len[doc_id], avg_len), doc_id)
+                             for doc_id, tf in postings.items())
+            cached = self._impacts[term] = [avg_len, entries, min(postings.values()), max(postings.values())]
+        return cached
+
+    def _score(self, doc_id, groups, avg_len):
+        """Full score of doc_id, or None unless it matches every query token.
+
+        A token scores through the best of the terms it matched, so a
+        prefix like 'ha' isn't worth more for hitting both handmade and
+        handcrafted.
+        """
+        # _impact() spelled out with the length part worked out once
+        norm = K1 * (1 - B + B * self._doc_len[doc_id] / avg_len)
+        score = 0.0
+        for terms in groups:
+            best = None
+            for term, coef in terms:
+                tf = self.postings[term].get(doc_id)
+                if tf is not None:
+                    term_score = coef * (tf * (K1 + 1) / (tf + norm))
+                    if best is None or term_score > best:
+                        best = term_score
+            if best is None:
+                return None
+            score += best
+        return score
+
+    def search(self, query, limit=None, accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Ranked (doc_id, score) pairs for products matching all query tokens"""
+        return self.rank(query, limit, accept)[0]
+
+    def rank(self, query, limit=None,
+             accept: Optional[Callable[[str], bool]] = None) -> Tuple[List[Tuple[str, float]], int, bool]:
+        """(top `limit` (doc_id, score) pairs, number of matches, whether that number is an estimate).
+
+        Only documents accept() says yes to are considered. Best first,
+        ties broken by id, so a longer limit always extends a shorter one.
+        The count is estimated when the walk stopped before seeing every match.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_len:
+            return [], 0, False
+
+        n_docs = len(self._doc_len)
+        avg_len = self._total_len / n_docs or 1.0
+
+        # Only the last token is always prefix-expanded (search-as-you-type);
+        # earlier ones fall back to prefixes only when they aren't a full word.
+        groups = []
+        for i, token in enumerate(tokens):
+            terms = self._expand(token, allow_prefix=(i == len(tokens) - 1))
+            if not terms:
+                return [], 0, False
+            weighted = []
+            for term, term_weight in terms.items():
+                df = len(self.postings[term])
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                weighted.append((term, term_weight * idf))
+            groups.append(weighted)
+
+        if limit is None:
+            ranked = self._rank_all(groups, avg_len, accept)
+            return ranked, len(ranked), False
+        return self._rank_top(groups, avg_len, limit, accept)
+
+    def _group_size(self, terms):
+        return sum(len(self.postings[term]) for term, _ in terms)
+
+    def _rank_all(self, groups, avg_len, accept):
+        # Intersect starting from the token with the fewest documents
+        candidates = None
+        for terms in sorted(groups, key=self._group_size):
+            docs = set()
+            for term, _ in terms:
+                docs.update(self.postings[term])
+            candidates = docs if candidates is None else candidates & docs
+            if not candidates:
+                return []
+
+        scored = []
+        for doc_id in candidates:
+            if accept is None or accept(doc_id):
+                scored.append((doc_id, self._score(doc_id, groups, avg_len)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return [(doc_id, round(score, 4)) for doc_id, score in scored]
+
+    def _lists(self, terms, avg_len):
+        """(scale, cached impact list) for each of a token's terms.
+
+        A scaled impact is the most that document can get from the term; a
+        list sorted at a shorter average length can underrate documents by
+        up to that ratio, which the scale allows for.
+        """
+        lists = []
+        for term, coef in terms:
+            cached = self._impact_list(term, avg_len)
+            lists.append((coef / min(1.0, cached[0] / avg_len), cached))
+        return lists
+
+    @staticmethod
+    def _stream(lists):
+        """(-bound, doc_id) for every posting in the lists, best first"""
+        streams = [_scaled(cached[1], scale) for scale, cached in lists]
+        return streams[0] if len(streams) == 1 else heapq.merge(*streams)
+
+    @staticmethod
+    def _rest(walked, others, bound, avg_len):
+        """Most the other tokens can add to a document still ahead on the walk.
+
+        Everything ahead gets at most `bound` from the walked token, so it
+        is at least as long as that takes with the token's lowest tf, and
+        the other tokens can't do better there than their highest tf.
+        """
+        shortest = min(_min_length(cached[2], bound / scale, cached[0]) for scale, cached in walked)
+        rest = 0.0
+        for head, terms in others:
+            reach = max(coef * _impact(tf_max, shortest, avg_len) for coef, tf_max in terms)
+            rest += min(head, reach)
+        return rest
+
+    def _rank_top(self, groups, avg_len, limit, accept):
+        if limit < 1:
+            return [], len(self._rank_all(groups, avg_len, accept)), False
+
+        # Every match has to contain the rarest token, so only its posting
+        # lists are walked, best impact first. Once the page's worst score
+        # beats what's left on the walk plus the most the other tokens can
+        # add to it, nothing unseen can get in.
+        driver = min(groups, key=self._group_size)
+        walked = self._lists(driver, avg_len)
+        others = []  # (best impact, [(coef, max tf)]) per other token
+        postings = []
+        for terms in groups:
+            if terms is not driver:
+                lists = self._lists(terms, avg_len)
+                head = -next(iter(self._stream(lists)))[0]
+                others.append((head, [(coef, cached[3]) for (_, coef), (_, cached) in zip(terms, lists)]))
+                postings.append([self.postings[term] for term, _ in terms])
+        rest = sum(head for head, _ in others)
+        rest_at = math.inf  # the walk bound `rest` was worked out for
+
+        seen = set()
+        scored = []
+        best = []  # min-heap of the `limit` best scores so far
+        floor = -math.inf  # the worst of them once there are `limit`
+        for steps, (neg_bound, doc_id) in enumerate(self._stream(walked)):
+            bound = -neg_bound
+            # Strictly better, so nothing unseen can even tie with the page.
+            # `rest` only shrinks as the walk goes on; working it out again
+            # costs more than a step, so that waits until the bound has dropped.
+            if floor > bound and others and bound < rest_at * 0.99:
+                rest = self._rest(walked, others, bound, avg_len)
+                rest_at = bound
+            if floor > bound + rest:
+                break
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            # Plain membership checks for the other tokens first - this loop
+            # is the hot path and most documents on it fail here
+            for token in postings:
+                for term_postings in token:
+                    if doc_id in term_postings:
+                        break
+                else:
+                    break
+            else:
+                if accept is not None and not accept(doc_id):
+                    continue
+                score = self._score(doc_id, groups, avg_len)
+                scored.append((doc_id, score))
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+                if len(best) == limit:
+                    floor = best[0]
+        else:
+            steps = None
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        hits = [(doc_id, round(score, 4)) for doc_id, score in scored[:limit]]
+        if steps is None:
+            return hits, len(scored), False
+        # Stopped early: guess the rest of the walk matches as often as what was seen
+        guess = round(len(scored) * self._group_size(driver) / steps)
+        return hits, max(len(scored), min(guess, len(self._doc_len))), True
+
+
+def _min_length(tf, impact, avg_len):
+    """Shortest document length at which `tf` gets no more than `impact` - _impact() turned around"""
+    return max(0.0, avg_len / (K1 * B) * (tf * (K1 + 1) / impact - tf - K1 * (1 - B)))
+
+
+def _scaled(entries, scale):
+    for neg_impact, doc_id in entries:
+        yield neg_impact * scale, doc_id
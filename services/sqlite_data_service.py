@@ -0,0 +1,560 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from typing import List, Optional, Dict, Any, Tuple, Iterator
+from models.artisan import Artisan
+from models.product import Product
+from services.search_index import tokenize
+from utils.helpers import load_json_data, get_timestamp
+from utils.pagination import (DEFAULT_SORT, parse_sort, sort_value, encode_cursor,
+                              cursor_key, cursor_offset, page_by_key, page_by_offset)
+from services.data_service import PRODUCT_SORT_FIELDS, ARTISAN_SORT_FIELDS
+
+ARTISAN_COLUMNS = ['id', 'name', 'email', 'phone', 'craft_type', 'location', 'bio',
+                   'experience_years', 'profile_image', 'created_at', 'updated_at',
+                   'status', 'verified', 'rating', 'total_products', 'total_orders']
+
+PRODUCT_COLUMNS = ['id', 'artisan_id', 'name', 'description', 'price', 'category',
+                   'subcategory', 'materials', 'dimensions', 'weight', 'stock_quantity',
+                   'images', 'created_at', 'updated_at', 'status', 'tags', 'featured']
+
+# Stored as JSON text
+JSON_COLUMNS = {'location', 'materials', 'dimensions', 'images', 'tags'}
+BOOL_COLUMNS = {'verified', 'featured'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artisans (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL COLLATE NOCASE,
+    phone TEXT,
+    craft_type TEXT,
+    location TEXT,
+    bio TEXT,
+    experience_years INTEGER DEFAULT 0,
+    profile_image TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    status TEXT DEFAULT 'active',
+    verified INTEGER DEFAULT 0,
+    rating REAL DEFAULT 0,
+    total_products INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_artisans_email ON artisans(email);
+CREATE INDEX IF NOT EXISTS idx_artisans_craft_type_lower ON artisans(lower(craft_type));
+
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    artisan_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    price REAL,
+    category TEXT,
+    subcategory TEXT,
+    materials TEXT,
+    dimensions TEXT,
+    weight REAL,
+    stock_quantity INTEGER DEFAULT 1,
+    images TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    status TEXT DEFAULT 'active',
+    tags TEXT,
+    featured INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_products_artisan ON products(artisan_id);
+-- Filters match case-insensitively, but distinct spellings stay distinct (as in the json engine)
+CREATE INDEX IF NOT EXISTS idx_products_category_lower ON products(lower(category));
+CREATE INDEX IF NOT EXISTS idx_products_status ON products(status, featured);
+CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products(price, id);
+
+-- Bumped by triggers on every write, so cached responses know when they're stale
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL,
+    modified REAL NOT NULL
+);
+INSERT OR IGNORE INTO catalog_version VALUES (1, 0, (julianday('now') - 2440587.5) * 86400.0);
+CREATE TRIGGER IF NOT EXISTS artisans_version_insert AFTER INSERT ON artisans BEGIN
+    UPDATE catalog_version SET generation = generation + 1, modified = (julianday('now') - 2440587.5) * 86400.0;
+END;
+CREATE TRIGGER IF NOT EXISTS artisans_version_update AFTER UPDATE ON artisans BEGIN
+    UPDATE catalog_version SET generation = generation + 1, modified = (julianday('now') - 2440587.5) * 86400.0;
+END;
+CREATE TRIGGER IF NOT EXISTS products_version_insert AFTER INSERT ON products BEGIN
+    UPDATE catalog_version SET generation = generation + 1, modified = (julianday('now') - 2440587.5) * 86400.0;
+END;
+CREATE TRIGGER IF NOT EXISTS products_version_update AFTER UPDATE ON products BEGIN
+    UPDATE catalog_version SET generation = generation + 1, modified = (julianday('now') - 2440587.5) * 86400.0;
+END;
+"""
+
+# Full-text search, kept in sync with the products table by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, description, materials, tags,
+    content='products', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts(rowid, name, description, materials, tags)
+    VALUES (new.rowid, new.name, new.description, new.materials, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, name, description, materials, tags)
+    VALUES ('delete', old.rowid, old.name, old.description, old.materials, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, name, description, materials, tags)
+    VALUES ('delete', old.rowid, old.name, old.description, old.materials, old.tags);
+    INSERT INTO products_fts(rowid, name, description, materials, tags)
+    VALUES (new.rowid, new.name, new.description, new.materials, new.tags);
+END;
+"""
+
+
+def _to_row(record, columns):
+    data = record.to_dict(columns)
+    row = []
+    for column in columns:
+        value = data.get(column)
+        if column in JSON_COLUMNS:
+            value = json.dumps(value)
+        elif column in BOOL_COLUMNS:
+            value = 1 if value else 0
+        row.append(value)
+    return row
+
+
+def _from_row(row, model_cls):
+    data = dict(row)
+    for column in JSON_COLUMNS:
+        if column in data and data[column] is not None:
+            data[column] = json.loads(data[column])
+    for column in BOOL_COLUMNS:
+        if column in data:
+            data[column] = bool(data[column])
+    return model_cls.from_dict(data)
+
+
+class SQLiteDataService:
+    """DataService with the same methods, backed by a SQLite database in WAL mode"""
+
+    def __init__(self, db_path=os.path.join("data", "kala_kaksh.db"), data_dir="data"):
+        self.db_path = db_path
+        self.data_dir = data_dir
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 - search falls back to LIKE
+            self.has_fts = False
+
+        # First run against an empty database: bring the JSON catalog over
+        self.migrated = False
+        if self._count('artisans') == 0 and self._count('products') == 0:
+            migrate_json_to_sqlite(data_dir, self)
+            self.migrated = True
+
+    def _conn(self):
+        """One connection per thread; sqlite3 connections can't be shared"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def preload(self) -> int:
+        # Nothing resident to share: the database is read through per-process connections
+        return 0
+
+    def after_fork(self):
+        # Never use a connection opened before the fork
+        self._local = threading.local()
+
+    def _count(self, table, where="", params=()):
+        return self._conn().execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+
+    def _upsert(self, conn, table, columns, record):
+        # ON CONFLICT ... DO UPDATE (not INSERT OR REPLACE) so the FTS update trigger fires
+        placeholders = ', '.join('?' for _ in columns)
+        assignments = ', '.join(f"{c} = excluded.{c}" for c in columns[1:])
+        conn.execute(f"""INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})
+                         ON CONFLICT(id) DO UPDATE SET {assignments}""",
+                     _to_row(record, columns))
+
+    def _update(self, conn, table, columns, record):
+        assignments = ', '.join(f"{c} = ?" for c in columns[1:])
+        row = _to_row(record, columns)
+        cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", row[1:] + row[:1])
+        return cursor.rowcount > 0
+
+    def _update_fields(self, table, model_cls, record_id, changes):
+        """Apply changes to the current row and UPDATE only the columns that changed"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return None
+            record = _from_row(row, model_cls)
+            columns = ['id'] + sorted(record.apply_changes(changes))
+            self._update(conn, table, columns, record)
+        return record
+
+    def data_version(self) -> Tuple[str, float]:
+        """(token, last_modified) that changes whenever any connection writes"""
+        generation, modified = self._conn().execute(
+            "SELECT generation, modified FROM catalog_version WHERE id = 1").fetchone()
+        return f"{os.path.abspath(self.db_path)}:{generation}", modified
+
+    def _keyset_page(self, table, model_cls, clauses, params, sort_field, descending, limit, cursor):
+        """ORDER BY + LIMIT with a keyset WHERE, using the same cursors as DataService"""
+        field = sort_field or DEFAULT_SORT
+        sort_spec = f"-{field}" if descending else field
+        clauses, params = list(clauses), list(params)
+
+        after = cursor_key(cursor, sort_spec)
+        if after is not None:
+            (kind, value), last_id = after
+            # NULLs sort first ascending and last descending, same as in Python
+            if kind == 0 and descending:
+                clauses.append(f"({field} IS NULL AND id < ?)")
+                params.append(last_id)
+            elif kind == 0:
+                clauses.append(f"(({field} IS NULL AND id > ?) OR {field} IS NOT NULL)")
+                params.append(last_id)
+            elif descending:
+                clauses.append(f"({field} < ? OR ({field} = ? AND id < ?) OR {field} IS NULL)")
+                params.extend([value, value, last_id])
+            else:
+                clauses.append(f"({field} > ? OR ({field} = ? AND id > ?))")
+                params.extend([value, value, last_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        limit_sql = f"LIMIT {int(limit) + 1}" if limit is not None else ""
+        rows = self._conn().execute(
+            f"SELECT * FROM {table} {where} ORDER BY {field} {direction}, id {direction} {limit_sql}", params)
+        records = [_from_row(row, model_cls) for row in rows]
+
+        if limit is None or len(records) <= limit:
+            return records, None
+        records = records[:limit]
+        last = records[-1]
+        return records, encode_cursor({'s': sort_spec, 'k': [list(sort_value(last, field)), last.id]})
+
+    # Artisan methods
+    def get_all_artisans(self) -> List[Artisan]:
+        rows = self._conn().execute("SELECT * FROM artisans ORDER BY rowid")
+        return [_from_row(row, Artisan) for row in rows]
+
+    def get_artisan_by_id(self, artisan_id: str) -> Optional[Artisan]:
+        row = self._conn().execute("SELECT * FROM artisans WHERE id = ?", (artisan_id,)).fetchone()
+        return _from_row(row, Artisan) if row else None
+
+    def get_artisan_by_email(self, email: str) -> Optional[Artisan]:
+        row = self._conn().execute("SELECT * FROM artisans WHERE email = ?", (email,)).fetchone()
+        return _from_row(row, Artisan) if row else None
+
+    def artisan_exists(self, artisan_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM artisans WHERE id = ?", (artisan_id,)).fetchone() is not None
+
+    def list_artisans(self, craft_type: Optional[str] = None, verified: bool = False,
+                      sort: Optional[str] = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of artisans plus the cursor for the next one"""
+        sort_field, descending = parse_sort(sort, ARTISAN_SORT_FIELDS)
+        clauses, params = [], []
+        if craft_type:
+            clauses.append("lower(craft_type) = lower(?)")
+            params.append(craft_type)
+        if verified:
+            clauses.append("verified = 1")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = self._count('artisans', where, params)
+        if sort_field is None and limit is None and not cursor:
+            rows = self._conn().execute(f"SELECT * FROM artisans {where} ORDER BY rowid", params)
+            return {'items': [_from_row(row, Artisan) for row in rows], 'next_cursor': None, 'total': total}
+
+        page, next_cursor = self._keyset_page('artisans', Artisan, clauses, params,
+                                              sort_field, descending, limit, cursor)
+        return {'items': page, 'next_cursor': next_cursor, 'total': total}
+
+    def create_artisan(self, artisan: Artisan) -> Artisan:
+        self._upsert(self._conn(), 'artisans', ARTISAN_COLUMNS, artisan)
+        return artisan
+
+    def update_artisan_fields(self, artisan_id: str, changes: Dict[str, Any]) -> Optional[Artisan]:
+        return self._update_fields('artisans', Artisan, artisan_id, changes)
+
+    def update_artisan(self, artisan: Artisan) -> Optional[Artisan]:
+        if self._update(self._conn(), 'artisans', ARTISAN_COLUMNS, artisan):
+            return artisan
+        return None
+
+    # Product methods
+    def get_all_products(self) -> List[Product]:
+        rows = self._conn().execute("SELECT * FROM products ORDER BY rowid")
+        return [_from_row(row, Product) for row in rows]
+
+    def get_product_by_id(self, product_id: str) -> Optional[Product]:
+        row = self._conn().execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        return _from_row(row, Product) if row else None
+
+    def get_products_by_artisan(self, artisan_id: str) -> List[Product]:
+        return self.query_products(artisan_id=artisan_id)
+
+    def get_products_by_category(self, category: str) -> List[Product]:
+        return self.query_products(category=category)
+
+    def query_products(self, category: Optional[str] = None, artisan_id: Optional[str] = None,
+                       status: Optional[str] = None, featured: bool = False) -> List[Product]:
+        """Filter products with an indexed WHERE clause"""
+        clauses, params = self._product_filters(category, artisan_id, status, featured)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(f"SELECT * FROM products {where} ORDER BY rowid", params)
+        return [_from_row(row, Product) for row in rows]
+
+    def _product_filters(self, category, artisan_id, status, featured):
+        clauses, params = [], []
+        if category is not None:
+            clauses.append("lower(category) = lower(?)")
+            params.append(category)
+        if artisan_id is not None:
+            clauses.append("artisan_id = ?")
+            params.append(artisan_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if featured:
+            clauses.append("featured = 1")
+        return clauses, params
+
+    def list_products(self, category: Optional[str] = None, artisan_id: Optional[str] = None,
+                      status: Optional[str] = None, featured: bool = False,
+                      search: Optional[str] = None, sort: Optional[str] = None,
+                      limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of products plus the cursor for the next one"""
+        sort_field, descending = parse_sort(sort, PRODUCT_SORT_FIELDS)
+
+        if search:
+            depth = None
+            if sort_field is None and limit is not None:
+                # Everything up to this page, plus one to know if there's another
+                depth = cursor_offset(cursor) + limit + 1
+            ranked, total = self._rank_products(search, depth, status, featured)
+            products = [p for p, _ in ranked]
+            scores = {p.id: score for p, score in ranked}
+            if sort_field is None:
+                page, next_cursor = page_by_offset(products, limit, cursor)
+            else:
+                page, next_cursor = page_by_key(products, sort_field, descending, limit, cursor)
+            return {'items': page, 'scores': scores, 'next_cursor': next_cursor, 'total': total,
+                    'total_is_estimate': False}
+
+        clauses, params = self._product_filters(category, artisan_id, status, featured)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = self._count('products', where, params)
+        if sort_field is None and limit is None and not cursor:
+            page, next_cursor = self.query_products(category, artisan_id, status, featured), None
+        else:
+            page, next_cursor = self._keyset_page('products', Product, clauses, params,
+                                                  sort_field, descending, limit, cursor)
+        return {'items': page, 'scores': None, 'next_cursor': next_cursor, 'total': total}
+
+    def _iter_rows(self, sql, params, model_cls, batch_size=500):
+        # Own connection so a long export doesn't hold this thread's connection open mid-read
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _from_row(row, model_cls)
+        finally:
+            conn.close()
+
+    def iter_products(self, status: Optional[str] = None) -> Iterator[Product]:
+        """Walk the catalog in batches without building a result list (for exports)"""
+        clauses, params = self._product_filters(None, None, status, False)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._iter_rows(f"SELECT * FROM products {where} ORDER BY rowid", params, Product)
+
+    def iter_artisans(self) -> Iterator[Artisan]:
+        return self._iter_rows("SELECT * FROM artisans ORDER BY rowid", (), Artisan)
+
+    def search_products(self, query: str) -> List[Product]:
+        return [product for product, _ in self.search_products_ranked(query)]
+
+    def search_products_ranked(self, query: str, limit: Optional[int] = None, status: Optional[str] = None,
+                               featured: bool = False) -> List[Tuple[Product, float]]:
+        """Best matches first, each with its relevance score"""
+        return self._rank_products(query, limit, status, featured)[0]
+
+    def _rank_products(self, query, limit, status, featured):
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        # Filters go into the query so LIMIT still fills the page
+        clauses, params = self._product_filters(None, None, status, featured)
+        if self.has_fts:
+            # Every token must match; the last one as a prefix (search-as-you-type)
+            match = ' '.join(f'"{t}"' for t in tokens[:-1]) + f' "{tokens[-1]}"*'
+            source = "products_fts JOIN products p ON p.rowid = products_fts.rowid"
+            clauses = ["products_fts MATCH ?"] + [f"p.{clause}" for clause in clauses]
+            params = [match.strip()] + params
+            columns, order = "p.*, -bm25(products_fts, 3.0, 1.0, 2.0, 2.0) AS score", "score DESC, p.id"
+        else:
+            # A % or _ typed in the search box is just a character
+            escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            like = f"%{escaped}%"
+            source = "products"
+            clauses = ["(lower(name) LIKE ? ESCAPE '\\' OR lower(description) LIKE ? ESCAPE '\\'"
+                       " OR lower(materials) LIKE ? ESCAPE '\\')"] + clauses
+            params = [like, like, like] + params
+            columns, order = "*, 1.0 AS score", "rowid"
+
+        where = f"WHERE {' AND '.join(clauses)}"
+        limit_sql = f"LIMIT {int(limit)}" if limit is not None else ""
+        rows = self._conn().execute(f"SELECT {columns} FROM {source} {where} ORDER BY {order} {limit_sql}", params)
+
+        results = []
+        for row in rows:
+            data = dict(row)
+            score = data.pop('score')
+            results.append((_from_row(data, Product), round(score, 4)))
+        if limit is None or len(results) < limit:
+            return results, len(results)
+        return results, self._count(source, where, params)
+
+    def create_product(self, product: Product) -> Product:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._upsert(conn, 'products', PRODUCT_COLUMNS, product)
+            # Counter bump happens in the same transaction, so concurrent creates can't lose one
+            conn.execute("UPDATE artisans SET total_products = total_products + 1, updated_at = ? WHERE id = ?",
+                         (get_timestamp(), product.artisan_id))
+        return product
+
+    def update_product_fields(self, product_id: str, changes: Dict[str, Any]) -> Optional[Product]:
+        return self._update_fields('products', Product, product_id, changes)
+
+    def update_product(self, product: Product) -> Optional[Product]:
+        if self._update(self._conn(), 'products', PRODUCT_COLUMNS, product):
+            return product
+        return None
+
+    def add_product_images(self, product_id: str, urls: List[str]) -> Optional[Product]:
+        """Append image URLs to the current copy of a product in a single write"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+            if row is None:
+                return None
+            product = _from_row(row, Product)
+            added = [url for url in urls if product.add_image(url)]
+            if added:
+                self._update(conn, 'products', PRODUCT_COLUMNS, product)
+        return product
+
+    def update_product_descriptions(self, descriptions: Dict[str, str]) -> int:
+        """Set many products' descriptions in one transaction; returns how many were updated"""
+        now = get_timestamp()
+        conn = self._conn()
+        with conn:
+            # Autocommit connection: without an explicit BEGIN every row would be its own commit
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.executemany("UPDATE products SET description = ?, updated_at = ? WHERE id = ?",
+                                      [(description, now, product_id) for product_id, description in descriptions.items()])
+        return cursor.rowcount
+
+    def set_profile_image(self, artisan_id: str, url: str) -> Optional[Artisan]:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM artisans WHERE id = ?", (artisan_id,)).fetchone()
+            if row is None:
+                return None
+            artisan = _from_row(row, Artisan)
+            artisan.profile_image = url
+            artisan.updated_at = get_timestamp()
+            self._update(conn, 'artisans', ARTISAN_COLUMNS, artisan)
+        return artisan
+
+    def get_categories(self) -> List[str]:
+        rows = self._conn().execute("SELECT DISTINCT category COLLATE BINARY AS category FROM products ORDER BY category")
+        return [row[0] for row in rows]
+
+    def get_craft_types(self) -> List[str]:
+        rows = self._conn().execute("SELECT DISTINCT craft_type COLLATE BINARY AS craft_type FROM artisans ORDER BY craft_type")
+        return [row[0] for row in rows]
+
+    def get_dashboard_stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        total_artisans, verified_artisans = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(verified), 0) FROM artisans").fetchone()
+        total_products, active_products = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'active'), 0) FROM products").fetchone()
+
+        return {
+            'total_artisans': total_artisans,
+            'total_products': total_products,
+            'verified_artisans': verified_artisans,
+            'active_products': active_products,
+            'categories': self.get_categories(),
+            'craft_types': self.get_craft_types()
+        }
+
+
+def migrate_json_to_sqlite(data_dir, service):
+    """Copy data/artisans.json and data/products.json into the database"""
+    artisans = load_json_data(os.path.join(data_dir, "artisans.json"))
+    products = load_json_data(os.path.join(data_dir, "products.json"))
+
+    conn = service._conn()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for item in artisans:
+            service._upsert(conn, 'artisans', ARTISAN_COLUMNS, Artisan.from_dict(item))
+        for item in products:
+            service._upsert(conn, 'products', PRODUCT_COLUMNS, Product.from_dict(item))
+
+    print(f"Migrated {len(artisans)} artisans and {len(products)} products into {service.db_path}")
+    return len(artisans), len(products)
+
+
+if __name__ == '__main__':
+    # python -m services.sqlite_data_service [data_dir] [db_path] [--force]
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    force = '--force' in sys.argv[1:]
+    data_dir = args[0] if len(args) > 0 else "data"
+    db_path = args[1] if len(args) > 1 else os.path.join(data_dir, "kala_kaksh.db")
+    service = SQLiteDataService(db_path, data_dir)
+    # An empty database was already migrated by the constructor
+    if not service.migrated:
+        if not force:
+            # The JSON files are likely older than the rows; upserting them would undo newer writes
+            print(f"❌ {db_path} already has data - not migrating over it (pass --force to overwrite from JSON)")
+            sys.exit(1)
+        migrate_json_to_sqlite(data_dir, service)
@@ -0,0 +1,281 @@
+import os
+import json
+import threading
+from typing import List, Optional, Tuple
+from utils.helpers import save_json_data, load_json_data
+from utils.locks import FileLock
+
+# How many logged mutations we allow before folding them into the snapshot
+DEFAULT_COMPACT_AFTER = 1000
+
+
+def file_signature(filepath):
+    """(mtime_ns, size, inode) for a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class JsonFileStorage:
+    """Original layout: the whole table is one JSON array, rewritten on every change"""
+
+    name = 'json'
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._signature = None
+
+    def has_changes(self):
+        """Cheap stat-only check for writes we haven't loaded yet"""
+        return file_signature(self.filepath) != self._signature
+
+    def version(self):
+        """What's on disk right now - the same in every worker process"""
+        return (file_signature(self.filepath),)
+
+    def poll(self) -> Optional[Tuple[bool, List[dict]]]:
+        """Return (full_reload, items) if the file changed since we last saw it"""
+        signature = file_signature(self.filepath)
+        if signature == self._signature:
+            return None
+
+        items = load_json_data(self.filepath)
+        self._signature = signature
+        return True, items
+
+    def write(self, records, record):
+        saved = save_json_data([r.to_dict(r.FIELDS) for r in records.values()], self.filepath)
+        self._signature = file_signature(self.filepath)
+        return saved
+
+    def write_many(self, records, changed):
+        # The whole file goes out either way - once for the lot
+        return self.write(records, None)
+
+
+class LogStorage:
+    """Snapshot plus append-only mutation log.
+
+    The snapshot is the usual JSON array file; each create/update appends
+    one line to `<file>.log`, so a write costs O(record). Loading reads the
+    snapshot and replays the log over it. Once the log gets long it is
+    rotated to `<file>.log.old` and a background thread writes a fresh
+    snapshot (temp file + rename) and drops the old log. Replaying a
+    record twice is harmless since every entry is a full upsert.
+
+    Callers serialize writes across processes; the compactor additionally
+    holds `<file>.compact.lock` so other workers can tell a compaction in
+    progress from one that died half way.
+    """
+
+    name = 'wal'
+
+    def __init__(self, filepath, compact_after=DEFAULT_COMPACT_AFTER, fsync=True):
+        self.filepath = filepath
+        self.log_path = f"{filepath}.log"
+        self.old_log_path = f"{filepath}.log.old"
+        self.compact_after = compact_after
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._snapshot_sig = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._entries = 0
+        self._compactor = None
+        self._compact_lock = FileLock(f"{filepath}.compact.lock")
+
+    def after_fork(self):
+        # A compaction running in the parent didn't come along, and its lock state mustn't either
+        self._lock = threading.RLock()
+        self._compactor = None
+
+    # Reading
+    def _read_log(self, path, offset=0):
+        """Parse complete lines from a log, returning (items, new_offset)"""
+        items = []
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn write at the tail - leave it for the next poll
+                        break
+                    offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        print(f"Warning: skipping corrupt log entry in {path}")
+                        continue
+                    if entry.get('op') == 'put':
+                        items.append(entry['data'])
+        except FileNotFoundError:
+            pass
+        return items, offset
+
+    def _full_load(self):
+        # A compaction elsewhere can swap the snapshot and delete the old log
+        # while we read; if the snapshot moved underneath us, just read again.
+        while True:
+            snapshot_sig = file_signature(self.filepath)
+            log_sig = file_signature(self.log_path)
+            items = list(load_json_data(self.filepath))
+            old_items, _ = self._read_log(self.old_log_path)
+            log_items, offset = self._read_log(self.log_path)
+            if file_signature(self.filepath) == snapshot_sig:
+                break
+
+        self._snapshot_sig = snapshot_sig
+        self._log_inode = log_sig[2] if log_sig else None
+        self._log_offset = offset
+        self._entries = len(old_items) + len(log_items)
+        return items + old_items + log_items
+
+    def version(self):
+        """What's on disk right now - the same in every worker process"""
+        return (file_signature(self.filepath), file_signature(self.log_path))
+
+    def has_changes(self):
+        """Cheap stat-only check for writes we haven't loaded yet"""
+        if file_signature(self.filepath) != self._snapshot_sig:
+            return True
+        log_sig = file_signature(self.log_path)
+        if log_sig is None:
+            return self._log_inode is not None
+        return log_sig[2] != self._log_inode or log_sig[1] != self._log_offset
+
+    def poll(self) -> Optional[Tuple[bool, List[dict]]]:
+        """Return (full_reload, items) for whatever changed since the last poll"""
+        with self._lock:
+            snapshot_sig = file_signature(self.filepath)
+            log_sig = file_signature(self.log_path)
+
+            if snapshot_sig == self._snapshot_sig:
+                log_inode = log_sig[2] if log_sig else None
+                log_size = log_sig[1] if log_sig else 0
+                if log_inode == self._log_inode and log_size == self._log_offset:
+                    return None
+                if log_inode == self._log_inode and log_size > self._log_offset:
+                    # Someone else appended - replay just the new entries
+                    items, self._log_offset = self._read_log(self.log_path, self._log_offset)
+                    self._entries += len(items)
+                    return False, items
+
+            return True, self._full_load()
+
+    # Writing
+    def write(self, records, record):
+        return self.write_many(records, [record])
+
+    def write_many(self, records, changed):
+        """Append one line per changed record, with a single write and fsync"""
+        lines = ''.join(json.dumps({'op': 'put', 'data': r.to_dict(r.FIELDS)}, separators=(',', ':')) + '\n'
+                        for r in changed)
+        with self._lock:
+            with open(self.log_path, 'ab') as f:
+                f.write(lines.encode('utf-8'))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                offset = f.tell()
+
+            log_sig = file_signature(self.log_path)
+            self._log_inode = log_sig[2]
+            self._log_offset = offset
+            self._entries += len(changed)
+
+            if self._entries >= self.compact_after:
+                self._start_compaction(records)
+        return True
+
+    def _start_compaction(self, records):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if not self._compact_lock.acquire(blocking=False):
+            # Another worker is compacting this table
+            return
+
+        try:
+            self._rotate_and_compact(records)
+        except Exception:
+            self._compact_lock.release()
+            raise
+
+    def _rotate_and_compact(self, records):
+        """Runs holding the compact lock; the background thread releases it"""
+        if os.path.exists(self.old_log_path):
+            # An earlier compaction died half way. What we hold in memory was
+            # loaded from the snapshot and both logs, so write it out directly.
+            try:
+                self._install_snapshot([r.to_dict(r.FIELDS) for r in records.values()],
+                                       (self.old_log_path, self.log_path))
+            finally:
+                self._compact_lock.release()
+            return
+
+        if not os.path.exists(self.log_path):
+            self._compact_lock.release()
+            return
+
+        # Everything written from here on lands in a fresh log, so the
+        # snapshot only has to cover what we hold right now.
+        os.replace(self.log_path, self.old_log_path)
+        self._log_inode = None
+        self._log_offset = 0
+        self._entries = 0
+        pending = list(records.values())
+
+        self._compactor = threading.Thread(target=self._compact, args=(pending,), daemon=True)
+        self._compactor.start()
+
+    def _compact(self, pending):
+        try:
+            self._install_snapshot([r.to_dict(r.FIELDS) for r in pending], (self.old_log_path,))
+        except Exception as e:
+            print(f"Log compaction failed for {self.filepath}: {e}")
+        finally:
+            self._compact_lock.release()
+
+    def _install_snapshot(self, snapshot, replaced_logs):
+        """Write a new snapshot and drop the logs it already covers"""
+        # Serialize outside the lock so writers keep appending meanwhile
+        staging_path = f"{self.filepath}.compact"
+        if not save_json_data(snapshot, staging_path):
+            return False
+
+        with self._lock:
+            os.replace(staging_path, self.filepath)
+            for path in replaced_logs:
+                if os.path.exists(path):
+                    os.remove(path)
+                if path == self.log_path:
+                    self._log_inode = None
+                    self._log_offset = 0
+                    self._entries = 0
+            self._snapshot_sig = file_signature(self.filepath)
+        return True
+
+    def compact(self, records):
+        """Fold the log into the snapshot now and wait for it to finish"""
+        with self._lock:
+            self._start_compaction(records)
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+
+STORAGE_ENGINES = {
+    JsonFileStorage.name: JsonFileStorage,
+    LogStorage.name: LogStorage,
+}
+
+
+def create_storage(engine, filepath):
+    """Build the storage for one table file by engine name"""
+    try:
+        storage_cls = STORAGE_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    return storage_cls(filepath)
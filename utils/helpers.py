@@ -1,8 +1,15 @@
 import os
 import uuid
 import json
+import threading
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from utils.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder works fine without it
+    orjson = None
 
 # ID generation
 def generate_id():
@@ -38,18 +45,43 @@ def allowed_file(filename, allowed_extensions=None):
     return ext in allowed_extensions
 
 # JSON handling
+@timed('json_save')
 def save_json_data(data, filepath):
     """Save data to a JSON file with error handling"""
     try:
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Write next to the target and rename over it, so a crash never leaves half a file
+        tmp_path = f"{filepath}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except Exception:
+            # Don't leave the half-written temp file lying around in the data folder
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         return True
     except Exception as e:
         print(f"Error saving JSON data: {e}")
         return False
 
+def encode_json(data):
+    """Compact JSON as UTF-8 bytes, using orjson when it's installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def decode_json(body):
+    """Parse JSON bytes (ValueError if they aren't JSON), using orjson when it's installed"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+@timed('json_load')
 def load_json_data(filepath):
     """Load data from a JSON file"""
     try:
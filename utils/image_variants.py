@@ -0,0 +1,43 @@
+import re
+
+# Every product image is stored as a folder of variants:
+#   <image dir>/160.jpg  160.webp  400.jpg  400.webp  800.jpg  800.webp  full.jpg  full.webp
+# and the product's images list holds the 800px JPEG, which is what it always held.
+VARIANT_WIDTHS = (160, 400, 800)
+VARIANT_FORMATS = {'jpeg': 'jpg', 'webp': 'webp'}
+ORIGINAL = 'full'
+PRIMARY_WIDTH = 800
+
+_VARIANT_URL = re.compile(r'^(?P<base>.+)/(?:%s)\.jpg$' % '|'.join(str(w) for w in VARIANT_WIDTHS + (ORIGINAL,)))
+
+
+def variant_name(size, fmt):
+    """File name for one variant, e.g. (400, 'webp') -> '400.webp'"""
+    return f"{size}.{VARIANT_FORMATS[fmt]}"
+
+
+def primary_name():
+    return variant_name(PRIMARY_WIDTH, 'jpeg')
+
+
+def variant_base(url):
+    """The folder part of a variant URL, or None for a single-file (older) image"""
+    match = _VARIANT_URL.match(url or '')
+    return match.group('base') if match else None
+
+
+def image_set(url):
+    """srcset-ready description of one stored image"""
+    base = variant_base(url)
+    if base is None:
+        # Uploaded before variants existed - only the one file
+        return {'src': url, 'srcset': None, 'original': None}
+
+    return {
+        'src': url,
+        'srcset': {
+            fmt: ', '.join(f"{base}/{variant_name(w, fmt)} {w}w" for w in VARIANT_WIDTHS)
+            for fmt in VARIANT_FORMATS
+        },
+        'original': {fmt: f"{base}/{variant_name(ORIGINAL, fmt)}" for fmt in VARIANT_FORMATS}
+    }
@@ -0,0 +1,140 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows - only the in-process locks apply there
+    fcntl = None
+
+
+class ReadWriteLock:
+    """Many readers or one writer, with waiting writers served first.
+
+    The write side is re-entrant for the thread holding it, and that
+    thread may also take the read side. A reader must not try to
+    upgrade to a writer.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth -= 1
+                return
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class FileLock:
+    """Exclusive flock() on a lock file, shared between worker processes.
+
+    This only arbitrates between processes: a blocking acquire while the
+    lock is already held in this process just nests, so threads must be
+    serialized by the caller (e.g. a ReadWriteLock). Non-blocking acquires
+    fail while it is held here. Release may happen on another thread. The
+    file is reopened after a fork, so a child never shares its parent's lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._depth = 0
+        self._mutex = threading.Lock()
+
+    def _open(self):
+        if self._fd is None or self._pid != os.getpid():
+            if self._fd is not None:
+                # Inherited over fork - it shares the parent's lock, so use our own
+                os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            self._depth = 0
+        return self._fd
+
+    def acquire(self, blocking=True):
+        """Take the lock; returns False if blocking=False and it is held anywhere"""
+        with self._mutex:
+            fd = self._open()
+            if self._depth:
+                if not blocking:
+                    return False
+                self._depth += 1
+                return True
+
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(fd, flags)
+                except BlockingIOError:
+                    return False
+            self._depth = 1
+            return True
+
+    def release(self):
+        with self._mutex:
+            self._depth -= 1
+            if self._depth == 0 and fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,176 @@
+"""Prometheus metrics for requests and the slow parts behind them.
+
+Off unless METRICS_ENABLED. While off, timed() hands functions back
+untouched, timer() is a shared do-nothing context manager and no request
+hooks are installed, so there's nothing to pay for it.
+
+Under gunicorn (see gunicorn.conf.py) every process - web workers and
+image workers alike - writes its numbers to PROMETHEUS_MULTIPROC_DIR and
+/metrics adds them all up. Without it, /metrics reports this process only.
+"""
+import os
+import time
+import inspect
+from contextlib import nullcontext
+from functools import wraps
+from config import Config
+
+ENABLED = Config.METRICS_ENABLED
+if ENABLED:
+    try:
+        from prometheus_client import Counter, Gauge, Histogram
+    except ImportError:
+        print("⚠️ METRICS_ENABLED is set but prometheus_client isn't installed - metrics are off")
+        ENABLED = False
+
+_NO_TIMER = nullcontext()
+
+if ENABLED:
+    # Bytes: 100B up to 16MB (the upload limit)
+    SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 4000000, 16000000)
+
+    REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time to answer a request',
+                                ['method', 'route', 'status'])
+    REQUEST_BYTES = Histogram('http_request_size_bytes', 'Request body size',
+                              ['method', 'route'], buckets=SIZE_BUCKETS)
+    RESPONSE_BYTES = Histogram('http_response_size_bytes', 'Response body size (streamed ones excluded)',
+                               ['method', 'route'], buckets=SIZE_BUCKETS)
+    IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled right now',
+                        ['method', 'route'], multiprocess_mode='livesum')
+    OPERATION_SECONDS = Histogram('operation_duration_seconds', 'Time spent in internal operations',
+                                  ['operation'])
+    OPERATION_ERRORS = Counter('operation_errors_total', 'Internal operations that raised',
+                               ['operation'])
+
+
+def timer(operation):
+    """Context manager timing a block as operation"""
+    if not ENABLED:
+        return _NO_TIMER
+    return _Timer(operation)
+
+
+class _Timer:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        OPERATION_SECONDS.labels(self.operation).observe(time.perf_counter() - self.start)
+        if exc_type is not None:
+            OPERATION_ERRORS.labels(self.operation).inc()
+
+
+def timed(operation):
+    """Decorator timing every call of a function (or coroutine function) as operation"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        seconds = OPERATION_SECONDS.labels(operation)
+        errors = OPERATION_ERRORS.labels(operation)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    seconds.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def init_app(app):
+    """Record every request to app (a no-op while metrics are off)"""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    def route():
+        # The rule, not the path, so /api/products/<product_id> is one series
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    @app.before_request
+    def start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = route()
+        IN_PROGRESS.labels(request.method, g.metrics_route).inc()
+        REQUEST_BYTES.labels(request.method, g.metrics_route).observe(request.content_length or 0)
+
+    @app.after_request
+    def record_response(response):
+        if 'metrics_start' in g:
+            REQUEST_SECONDS.labels(request.method, g.metrics_route, response.status_code).observe(
+                time.perf_counter() - g.metrics_start)
+            if not response.is_streamed:
+                RESPONSE_BYTES.labels(request.method, g.metrics_route).observe(response.content_length or 0)
+        return response
+
+    @app.teardown_request
+    def end_request(error=None):
+        # Runs even when the view blew up
+        if 'metrics_route' in g:
+            IN_PROGRESS.labels(request.method, g.metrics_route).dec()
+
+
+async def observe_asgi(route, scope, receive, send, handler, **params):
+    """Run an ASGI handler, recording it the way init_app() records Flask requests"""
+    if not ENABLED:
+        return await handler(scope, receive, send, **params)
+
+    method = scope['method']
+    start = time.perf_counter()
+    seen = {'status': 500, 'bytes_in': 0, 'bytes_out': 0}
+
+    async def counting_receive():
+        message = await receive()
+        seen['bytes_in'] += len(message.get('body', b''))
+        return message
+
+    async def counting_send(message):
+        if message['type'] == 'http.response.start':
+            seen['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            seen['bytes_out'] += len(message.get('body', b''))
+        await send(message)
+
+    IN_PROGRESS.labels(method, route).inc()
+    try:
+        return await handler(scope, counting_receive, counting_send, **params)
+    finally:
+        IN_PROGRESS.labels(method, route).dec()
+        REQUEST_SECONDS.labels(method, route, seen['status']).observe(time.perf_counter() - start)
+        REQUEST_BYTES.labels(method, route).observe(seen['bytes_in'])
+        RESPONSE_BYTES.labels(method, route).observe(seen['bytes_out'])
+
+
+def render():
+    """(body, content type) of every metric in the Prometheus text format"""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,157 @@
+import json
+import heapq
+import base64
+from typing import List, Optional, Tuple
+
+DEFAULT_SORT = 'created_at'
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(payload):
+    """Opaque, URL-safe cursor string"""
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid cursor')
+    return payload
+
+
+def cursor_key(cursor, sort_spec):
+    """((kind, value), id) a keyset cursor points past, or None for the first page"""
+    payload = decode_cursor(cursor)
+    if payload is None:
+        return None
+    if payload.get('s') != sort_spec or 'k' not in payload:
+        raise ValueError('Cursor does not match this sort order')
+    # The cursor comes from the client, so check it has the shape sort_value() gives
+    key = payload['k']
+    if not (isinstance(key, list) and len(key) == 2 and isinstance(key[0], list) and len(key[0]) == 2):
+        raise ValueError('Invalid cursor')
+    (kind, value), record_id = key
+    valid = ((kind == 0 and value == 0) or
+             (kind == 1 and isinstance(value, (int, float)) and not isinstance(value, bool)) or
+             (kind == 2 and isinstance(value, str)))
+    if not valid or isinstance(kind, bool) or not isinstance(record_id, str):
+        raise ValueError('Invalid cursor')
+    return (kind, value), record_id
+
+
+def parse_limit(value, maximum=MAX_PAGE_SIZE):
+    """Validate ?limit=; None means no pagination"""
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise ValueError('limit must be a number')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, maximum)
+
+
+def parse_sort(value, allowed):
+    """'price' or '-price' -> ('price', descending)"""
+    if not value:
+        return None, False
+    descending = value.startswith('-')
+    field = value.lstrip('-')
+    if field not in allowed:
+        raise ValueError(f"Can't sort by {field}. Options: {', '.join(sorted(allowed))}")
+    return field, descending
+
+
+def parse_fields(value, allowed):
+    """Validate ?fields=a,b,c against the model's fields; None means everything"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Always keep the id so clients can follow up on a record
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def sort_value(record, field):
+    value = getattr(record, field, None)
+    # Keep mixed/missing values comparable
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+def page_by_key(records, field, descending=False, limit=None, cursor=None) -> Tuple[List, Optional[str]]:
+    """Keyset pagination over (sort value, id).
+
+    Only the requested page is ever sorted: records past the cursor are
+    fed through a bounded heap, so a page costs O(n log limit).
+    """
+    field = field or DEFAULT_SORT
+    sort_spec = f"-{field}" if descending else field
+
+    def key(record):
+        return (sort_value(record, field), record.id)
+
+    after = cursor_key(cursor, sort_spec)
+
+    if after is not None:
+        if descending:
+            records = (r for r in records if key(r) < after)
+        else:
+            records = (r for r in records if key(r) > after)
+
+    if limit is None:
+        return sorted(records, key=key, reverse=descending), None
+
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    # Grab one extra to know whether there is a next page
+    page = pick(limit + 1, records, key=key)
+    if len(page) <= limit:
+        return page, None
+
+    page = page[:limit]
+    last = key(page[-1])
+    return page, encode_cursor({'s': sort_spec, 'k': [list(last[0]), last[1]]})
+
+
+def cursor_offset(cursor):
+    """How many ranked results an offset cursor skips (0 for the first page)"""
+    payload = decode_cursor(cursor)
+    if payload is None:
+        return 0
+    if 'o' not in payload:
+        raise ValueError('Cursor does not match this listing')
+    offset = payload['o']
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
+
+
+def page_by_offset(records, limit=None, cursor=None) -> Tuple[List, Optional[str]]:
+    """Offset pagination for results that come pre-ranked (search).
+
+    records only has to reach one past the end of the page; anything
+    further is ignored.
+    """
+    offset = cursor_offset(cursor)
+
+    if limit is None:
+        return records[offset:], None
+
+    page = records[offset:offset + limit]
+    next_cursor = encode_cursor({'o': offset + limit}) if offset + limit < len(records) else None
+    return page, next_cursor
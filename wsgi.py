@@ -0,0 +1,12 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (see gunicorn.conf.py) this runs once in the master:
+the app and the catalog are loaded before the workers are forked, so
+they share that memory instead of each loading their own copy.
+"""
+from app import create_app, preload
+
+app = create_app()
+preload(app)